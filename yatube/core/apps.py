@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        if getattr(settings, 'SQLITE_PROFILE', False):
+            from .sqlite_backend.base import DatabaseWrapper
+            from .sqlite_profile import configure_connection
+            connection_created.connect(configure_connection,
+                                       sender=DatabaseWrapper)
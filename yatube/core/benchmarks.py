@@ -0,0 +1,37 @@
+"""Общие помощники для команд-бенчмарков."""
+import time
+
+
+def percentile(samples, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1,
+                      round(percent / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples):
+    """p50/p95/p99 и среднее для списка длительностей в секундах."""
+    return {
+        'count': len(samples),
+        'mean': sum(samples) / len(samples) if samples else 0.0,
+        'p50': percentile(samples, 50),
+        'p95': percentile(samples, 95),
+        'p99': percentile(samples, 99),
+    }
+
+
+def timed(callback, repeat):
+    """Вызывает callback repeat раз и возвращает длительности вызовов."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        callback()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def format_us(seconds):
+    return f'{seconds * 1e6:.1f} мкс'
@@ -0,0 +1,49 @@
+import os
+import tempfile
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import format_us, summarize, timed
+from core.sqlite_cache import SQLiteCache
+
+PAYLOAD = 'x' * 2048
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает задержки SQLiteCache и LocMemCache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5000)
+
+    def measure(self, cache, keys, repeat):
+        for i in range(keys):
+            cache.set(f'key:{i}', PAYLOAD)
+        counter = iter(range(repeat * 2))
+        hits = timed(lambda: cache.get(f'key:{next(counter) % keys}'),
+                     repeat)
+        misses = timed(lambda: cache.get(f'missing:{next(counter)}'),
+                       repeat)
+        incr_key = 'counter'
+        cache.set(incr_key, 0)
+        incrs = timed(lambda: cache.incr(incr_key), repeat)
+        return {'hit': summarize(hits), 'miss': summarize(misses),
+                'incr': summarize(incrs)}
+
+    def handle(self, *args, **options):
+        keys, repeat = options['keys'], options['repeat']
+        with tempfile.TemporaryDirectory() as directory:
+            backends = {
+                'LocMemCache': LocMemCache('bench', {}),
+                'SQLiteCache': SQLiteCache(
+                    os.path.join(directory, 'cache.sqlite3'), {}),
+            }
+            for name, cache in backends.items():
+                results = self.measure(cache, keys, repeat)
+                for operation, stats in results.items():
+                    self.stdout.write(
+                        f'{name:12} {operation:5} '
+                        f'p50={format_us(stats["p50"])} '
+                        f'p95={format_us(stats["p95"])} '
+                        f'p99={format_us(stats["p99"])}')
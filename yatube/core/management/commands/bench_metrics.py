@@ -0,0 +1,47 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import resolve
+
+from core.benchmarks import format_us, summarize, timed
+from core.metrics import Registry
+from core.middleware import MetricsMiddleware
+
+
+class Command(BaseCommand):
+    help = 'Измеряет накладные расходы MetricsMiddleware на запрос.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/')
+        request.resolver_match = resolve('/')
+        response = HttpResponse()
+
+        def view(request):
+            return response
+
+        with tempfile.TemporaryDirectory() as directory:
+            # Свои реестры, чтобы не портить настоящие метрики.
+            path = os.path.join(directory, 'metrics.sqlite3')
+            variants = {
+                'без метрик': view,
+                'в памяти': MetricsMiddleware(view, Registry()),
+                'с файлом': MetricsMiddleware(view, Registry(path)),
+            }
+            baseline = None
+            for name, handler in variants.items():
+                stats = summarize(timed(lambda: handler(request),
+                                        options['repeat']))
+                if baseline is None:
+                    baseline = stats
+                self.stdout.write(
+                    f'{name:11} p50={format_us(stats["p50"])} '
+                    f'p99={format_us(stats["p99"])} '
+                    f'накладные p50='
+                    f'{format_us(stats["p50"] - baseline["p50"])} '
+                    f'mean={format_us(stats["mean"] - baseline["mean"])}')
@@ -0,0 +1,121 @@
+import os
+import sqlite3
+import tempfile
+import time
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import summarize
+from core.sqlite_profile import (RETRY_DELAY, WRITE_RETRIES, apply_pragmas,
+                                 is_locked)
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, comments_count INTEGER)',
+    'CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER,'
+    ' text TEXT, created REAL)',
+    'CREATE INDEX comment_post ON comment (post_id, created)',
+)
+POSTS = 100
+# Как у Django по умолчанию: sqlite3.connect(timeout=5).
+PLAIN_TIMEOUT = 5.0
+
+
+def add_comment(connection, begin, post_id, text):
+    """То же, что add_comment: чтение поста, запись и счётчик."""
+    connection.execute(begin)
+    try:
+        connection.execute('SELECT id FROM post WHERE id = ?',
+                           (post_id,)).fetchone()
+        connection.execute(
+            'INSERT INTO comment (post_id, text, created) VALUES (?, ?, ?)',
+            (post_id, text, time.time()))
+        connection.execute(
+            'UPDATE post SET comments_count = comments_count + 1'
+            ' WHERE id = ?', (post_id,))
+        connection.execute('COMMIT')
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+
+
+def worker(path, profile, writes, worker_id):
+    connection = sqlite3.connect(path, timeout=PLAIN_TIMEOUT,
+                                 isolation_level=None)
+    if profile:
+        apply_pragmas(connection)
+    begin = 'BEGIN IMMEDIATE' if profile else 'BEGIN'
+    retries = WRITE_RETRIES if profile else 1
+    durations, failed = [], 0
+    # Время запуска процессов не входит в замер.
+    began = time.time()
+    for i in range(writes):
+        started = time.perf_counter()
+        for attempt in range(retries):
+            try:
+                add_comment(connection, begin, i % POSTS + 1,
+                            f'комментарий {worker_id}-{i}')
+                durations.append(time.perf_counter() - started)
+                break
+            except sqlite3.OperationalError as error:
+                if not is_locked(error) or attempt == retries - 1:
+                    failed += 1
+                    break
+                time.sleep(RETRY_DELAY * 2 ** attempt)
+    connection.close()
+    return durations, failed, began, time.time()
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает конкурентную запись в SQLite без профиля '
+            'и с продакшен-профилем (WAL, PRAGMA, BEGIN IMMEDIATE, '
+            'повторы).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=300,
+                            help='Комментариев на процесс.')
+
+    def prepare(self, path):
+        connection = sqlite3.connect(path, isolation_level=None)
+        for statement in SCHEMA:
+            connection.execute(statement)
+        connection.executemany(
+            'INSERT INTO post (id, comments_count) VALUES (?, 0)',
+            [(i,) for i in range(1, POSTS + 1)])
+        connection.close()
+
+    def run(self, directory, profile, workers, writes):
+        path = os.path.join(directory, f'bench-{int(profile)}.sqlite3')
+        self.prepare(path)
+        with get_context('spawn').Pool(workers) as pool:
+            results = pool.starmap(worker, [
+                (path, profile, writes, worker_id)
+                for worker_id in range(workers)])
+        elapsed = (max(result[3] for result in results)
+                   - min(result[2] for result in results))
+        durations = [value for result in results for value in result[0]]
+        failed = sum(result[1] for result in results)
+        return elapsed, durations, failed
+
+    def handle(self, *args, **options):
+        workers, writes = options['workers'], options['writes']
+        self.stdout.write(f'{workers} процессов по {writes} записей')
+        throughput = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name, profile in (('без профиля', False),
+                                  ('профиль', True)):
+                elapsed, durations, failed = self.run(
+                    directory, profile, workers, writes)
+                stats = summarize(durations)
+                throughput[profile] = len(durations) / elapsed
+                self.stdout.write(
+                    f'{name:>12}: {throughput[profile]:8.0f} записей/с, '
+                    f'ошибок {failed}, '
+                    f'p50 {stats["p50"] * 1000:.1f} мс, '
+                    f'p95 {stats["p95"] * 1000:.1f} мс, '
+                    f'p99 {stats["p99"] * 1000:.1f} мс')
+        if throughput[False]:
+            self.stdout.write(self.style.SUCCESS(
+                f'Ускорение записи: '
+                f'{throughput[True] / throughput[False]:.1f}x'))
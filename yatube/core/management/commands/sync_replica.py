@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.routers import REPLICA
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файл реплики: локальная '
+            'замена репликации для ReplicaRouter.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target',
+                            help='Файл реплики; по умолчанию NAME базы '
+                                 f'{REPLICA} из настроек.')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Повторять копирование с этим '
+                                 'интервалом, секунд.')
+
+    def target(self, options):
+        target = options['target']
+        if target is None:
+            database = settings.DATABASES.get(REPLICA)
+            if database is None:
+                raise CommandError(
+                    f'Нет базы {REPLICA}: задайте YATUBE_REPLICA_DB '
+                    'или --target.')
+            target = database['NAME']
+        return target
+
+    def copy(self, target):
+        """Согласованный снимок через backup API и атомарная подмена.
+
+        Читатели реплики держат открытым старый файл до конца запроса,
+        а новые соединения открывают уже новую копию.
+        """
+        source = connections[DEFAULT_DB_ALIAS]
+        source.ensure_connection()
+        temporary = f'{target}.tmp'
+        started = time.perf_counter()
+        destination = sqlite3.connect(temporary)
+        try:
+            source.connection.backup(destination)
+            # Снимок базы в WAL тоже в WAL; старые -wal и -shm рядом
+            # с заменяемым файлом не должны к нему применяться.
+            destination.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            destination.close()
+        os.replace(temporary, target)
+        self.stdout.write(
+            f'Реплика {target} обновлена за '
+            f'{time.perf_counter() - started:.2f} с.')
+
+    def handle(self, *args, **options):
+        target = self.target(options)
+        if options['interval'] <= 0:
+            self.copy(target)
+            return
+        while True:
+            self.copy(target)
+            time.sleep(options['interval'])
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = ('Прогревает процесс: шаблоны, адреса, соединения с базой '
+            'и кэш горячих страниц; печатает время каждого шага.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default=None,
+                            help='Хост для ключей кэша страниц.')
+
+    def handle(self, *args, **options):
+        timings = warm_up(host=options['host'])
+        for name, elapsed, count in timings:
+            self.stdout.write(f'{name:>12}: {count:5d} за '
+                              f'{elapsed * 1000:8.1f} мс')
+        total = sum(elapsed for _, elapsed, _ in timings)
+        self.stdout.write(self.style.SUCCESS(
+            f'Прогрев занял {total * 1000:.1f} мс.'))
@@ -0,0 +1,220 @@
+"""Метрики в текстовом формате Prometheus.
+
+Каждый процесс копит приращения счётчиков в памяти и не чаще раза
+в METRICS_FLUSH_INTERVAL секунд сбрасывает их одной транзакцией
+в общий файл SQLite (METRICS_PATH). /metrics читает сумму по всем
+воркерам из этого файла. Без METRICS_PATH метрики живут в памяти
+процесса — этого хватает для runserver и тестов.
+
+Все метрики аддитивны, поэтому суммирование приращений от разных
+процессов даёт верный результат; у гистограммы каждое наблюдение
+увеличивает все бакеты с le не меньше длительности.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+BUSY_TIMEOUT = 5.0
+FLUSH_INTERVAL = 1.0
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, float('inf'))
+
+REQUESTS = 'yatube_requests_total'
+LATENCY = 'yatube_request_duration_seconds'
+SQL_QUERIES = 'yatube_sql_queries_total'
+SQL_TIME = 'yatube_sql_duration_seconds_total'
+CACHE = 'yatube_cache_requests_total'
+
+FAMILIES = {
+    REQUESTS: ('counter', 'Запросы по представлению, методу и статусу.'),
+    LATENCY: ('histogram', 'Время ответа представления.'),
+    SQL_QUERIES: ('counter', 'SQL-запросы, сделанные представлением.'),
+    SQL_TIME: ('counter', 'Время SQL-запросов представления.'),
+    CACHE: ('counter', 'Обращения к кэшу страниц и фрагментов.'),
+}
+
+LE_RE = re.compile(r',?le="([^"]+)"')
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS metrics ('
+    ' name TEXT NOT NULL,'
+    ' labels TEXT NOT NULL,'
+    ' value REAL NOT NULL,'
+    ' PRIMARY KEY (name, labels))'
+)
+
+
+def format_labels(labels):
+    """Метки в виде {a="1",b="2"} с экранированием по формату."""
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels:
+        value = (str(value).replace('\\', '\\\\').replace('"', '\\"')
+                 .replace('\n', '\\n'))
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _sort_key(item):
+    # Бакеты по возрастанию границы, а не по строке: "+Inf" последним.
+    (name, labels), _ = item
+    match = LE_RE.search(labels)
+    if match is None:
+        return name, labels, 0.0
+    return (name, LE_RE.sub('', labels), float(match.group(1)))
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Registry:
+    """Счётчики процесса и их сброс в общий файл."""
+
+    def __init__(self, path=None, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._keys = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._flushed = time.monotonic()
+
+    def inc(self, name, labels=(), value=1.0):
+        key = (name, format_labels(labels))
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0.0) + value
+
+    def _histogram_keys(self, name, labels):
+        # Строки меток бакетов собираются один раз на представление.
+        keys = self._keys.get((name, labels))
+        if keys is None:
+            plain = format_labels(labels)
+            keys = (
+                [(bound, (f'{name}_bucket', format_labels(
+                    labels + (('le', format_value(bound)),))))
+                 for bound in LATENCY_BUCKETS],
+                (f'{name}_sum', plain),
+                (f'{name}_count', plain),
+            )
+            self._keys[(name, labels)] = keys
+        return keys
+
+    def observe(self, name, labels, seconds):
+        """Наблюдение гистограммы: бакеты, сумма и количество."""
+        buckets, sum_key, count_key = self._histogram_keys(
+            name, tuple(labels))
+        with self._lock:
+            pending = self._pending
+            for bound, key in buckets:
+                if seconds <= bound:
+                    pending[key] = pending.get(key, 0.0) + 1
+            pending[sum_key] = pending.get(sum_key, 0.0) + seconds
+            pending[count_key] = pending.get(count_key, 0.0) + 1
+
+    @property
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(
+                self.path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _take(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed = time.monotonic()
+        return pending
+
+    def maybe_flush(self):
+        if (self.path
+                and time.monotonic() - self._flushed >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Сбрасывает накопленные приращения в общий файл."""
+        if not self.path:
+            return
+        pending = self._take()
+        if not pending:
+            return
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            for (name, labels), value in pending.items():
+                updated = connection.execute(
+                    'UPDATE metrics SET value = value + ?'
+                    ' WHERE name = ? AND labels = ?',
+                    (value, name, labels)).rowcount
+                if not updated:
+                    connection.execute(
+                        'INSERT INTO metrics (name, labels, value)'
+                        ' VALUES (?, ?, ?)', (name, labels, value))
+        except BaseException:
+            connection.execute('ROLLBACK')
+            # Не теряем приращения: вернём их в очередь.
+            with self._lock:
+                for key, value in pending.items():
+                    self._pending[key] = self._pending.get(key, 0.0) + value
+            raise
+        connection.execute('COMMIT')
+
+    def samples(self):
+        """Текущие значения: из общего файла или из памяти процесса."""
+        if not self.path:
+            with self._lock:
+                return dict(self._pending)
+        self.flush()
+        return {(name, labels): value for name, labels, value in
+                self._connection.execute(
+                    'SELECT name, labels, value FROM metrics')}
+
+    def reset(self):
+        with self._lock:
+            self._pending = {}
+        if self.path:
+            self._connection.execute('DELETE FROM metrics')
+
+    def render(self):
+        """Текст для /metrics в формате exposition 0.0.4."""
+        samples = self.samples()
+        lines = []
+        for family, (kind, help_text) in FAMILIES.items():
+            names = ((f'{family}_bucket', f'{family}_sum', f'{family}_count')
+                     if kind == 'histogram' else (family,))
+            rows = sorted(
+                ((key, value) for key, value in samples.items()
+                 if key[0] in names), key=_sort_key)
+            if not rows:
+                continue
+            lines.append(f'# HELP {family} {help_text}')
+            lines.append(f'# TYPE {family} {kind}')
+            for (name, labels), value in rows:
+                lines.append(f'{name}{labels} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry(getattr(settings, 'METRICS_PATH', None),
+                    getattr(settings, 'METRICS_FLUSH_INTERVAL',
+                            FLUSH_INTERVAL))
+
+
+def record_cache(kind, hits=0, misses=0):
+    """Учитывает попадания и промахи кэша страниц или фрагментов."""
+    if hits:
+        registry.inc(CACHE, (('cache', kind), ('result', 'hit')), hits)
+    if misses:
+        registry.inc(CACHE, (('cache', kind), ('result', 'miss')), misses)
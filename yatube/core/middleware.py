@@ -0,0 +1,86 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import routers
+from .metrics import LATENCY, REQUESTS, SQL_QUERIES, SQL_TIME, registry
+
+UNRESOLVED = 'unresolved'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class SQLTimer:
+    """Обёртка execute_wrapper: число и время запросов одного ответа."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+class MetricsMiddleware:
+    """Собирает метрики запросов по имени представления."""
+
+    def __init__(self, get_response, registry=registry):
+        self.get_response = get_response
+        self.registry = registry
+
+    def __call__(self, request):
+        timer = SQLTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else UNRESOLVED
+        labels = (('view', view),)
+        self.registry.inc(REQUESTS, labels + (
+            ('method', request.method),
+            ('status', response.status_code),
+        ))
+        self.registry.observe(LATENCY, labels, elapsed)
+        if timer.queries:
+            self.registry.inc(SQL_QUERIES, labels, timer.queries)
+            self.registry.inc(SQL_TIME, labels, timer.seconds)
+        self.registry.maybe_flush()
+        return response
+
+
+class ReplicaPinMiddleware:
+    """Держит чтения на основной базе после записи пользователя.
+
+    Небезопасные методы и запросы с cookie закрепления читают из
+    основной базы; если запрос что-то записал, cookie ставится ещё на
+    REPLICA_PIN_SECONDS, пока реплика не догонит основную базу.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS',
+                                   routers.PIN_SECONDS)
+
+    def __call__(self, request):
+        routers.begin_request()
+        if (request.method not in SAFE_METHODS
+                or routers.PIN_COOKIE in request.COOKIES):
+            routers.pin()
+        try:
+            response = self.get_response(request)
+            if routers.wrote():
+                response.set_cookie(routers.PIN_COOKIE, '1',
+                                    max_age=self.pin_seconds,
+                                    httponly=True, samesite='Lax')
+        finally:
+            routers.reset()
+        return response
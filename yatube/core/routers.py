@@ -0,0 +1,84 @@
+"""Чтение с реплики, запись в основную базу.
+
+Пример настройки (так делает settings.py при YATUBE_REPLICA_DB)::
+
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': '/var/lib/yatube/replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+Реплика отстаёт от основной базы, поэтому после записи запрос
+«прилипает» к основной базе: до конца текущего запроса и ещё на
+REPLICA_PIN_SECONDS — через cookie, которую ставит
+ReplicaPinMiddleware. Так автор сразу видит свой пост, комментарий
+или подписку. Для локальной проверки репликой служит копия файла
+SQLite, которую обновляет команда sync_replica.
+
+На реплику идут только чтения внутри запроса (его начало отмечает
+ReplicaPinMiddleware). Фоновые потоки (миниатюры, очередь
+write-behind) и команды работают сразу после записи и читают из
+основной базы.
+"""
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+PIN_COOKIE = 'yatube_primary'
+PIN_SECONDS = 5
+# Сессии читаются в каждом запросе и пишутся при входе: отставшая
+# реплика разлогинила бы пользователя.
+PRIMARY_APPS = {'sessions'}
+
+_state = threading.local()
+
+
+def pin():
+    """Направляет чтения текущего потока в основную базу."""
+    _state.pinned = True
+
+
+def begin_request():
+    """Отмечает начало запроса: его чтения можно отдать реплике."""
+    reset()
+    _state.in_request = True
+
+
+def reset():
+    _state.pinned = False
+    _state.wrote = False
+    _state.in_request = False
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def wrote():
+    """Была ли запись с начала текущего запроса."""
+    return getattr(_state, 'wrote', False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (is_pinned()
+                or not getattr(_state, 'in_request', False)
+                or model._meta.app_label in PRIMARY_APPS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        # Всё, что прочитано после записи, должно её видеть.
+        _state.wrote = True
+        pin()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика — копия основной базы, объекты из обеих совместимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
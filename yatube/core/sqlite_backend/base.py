@@ -0,0 +1,14 @@
+"""SQLite, в котором транзакции сразу берут блокировку записи.
+
+Обычный BEGIN откладывает блокировку до первой записи. Если к этому
+моменту другой процесс уже пишет, SQLite не ждёт busy_timeout,
+а сразу возвращает «database is locked»: ожидание привело бы
+к взаимной блокировке. BEGIN IMMEDIATE встаёт в очередь за писателем
+ещё до первого чтения и ждёт по busy_timeout.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
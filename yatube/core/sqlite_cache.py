@@ -0,0 +1,279 @@
+"""Кэш в файле SQLite, общий для всех процессов на одном хосте.
+
+LocMemCache живёт внутри процесса: у каждого WSGI-воркера свой кэш,
+и инвалидация в одном воркере не видна остальным. Этот бэкенд хранит
+данные в одном файле SQLite в режиме WAL: читатели не блокируют
+писателя, а атомарность incr/add обеспечивает блокировка записи SQLite.
+
+Пример настройки::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.sqlite_cache.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+            'OPTIONS': {'MAX_BYTES': 256 * 1024 * 1024},
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+MAX_BYTES = 64 * 1024 * 1024
+BUSY_TIMEOUT = 5.0
+# Время последнего чтения обновляется не чаще раза в секунду, чтобы
+# чтения почти никогда не превращались в запись.
+ACCESS_RESOLUTION = 1.0
+EVICT_BATCH = 100
+MAX_PARAMS = 500
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL,'
+    ' size INTEGER NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    # Вытеснение ищет истёкшие ключи на каждой записи при полном кэше.
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+    'CREATE TABLE IF NOT EXISTS cache_meta ('
+    ' id INTEGER PRIMARY KEY CHECK (id = 1),'
+    ' total INTEGER NOT NULL)',
+    'INSERT OR IGNORE INTO cache_meta (id, total) VALUES (1, 0)',
+)
+
+
+class SQLiteCache(BaseCache):
+    """Кэш с TTL, LRU-вытеснением по объёму и атомарным incr."""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self.max_bytes = int(options.get('MAX_BYTES', MAX_BYTES))
+        self.busy_timeout = float(options.get('BUSY_TIMEOUT', BUSY_TIMEOUT))
+        self._local = threading.local()
+
+    @property
+    def _connection(self):
+        # Соединение своё у каждого потока и у каждого процесса после fork.
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(
+                self.path, timeout=self.busy_timeout,
+                isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _write(self, callback):
+        """Выполняет callback в транзакции с блокировкой записи."""
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = callback(connection)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return result
+
+    @staticmethod
+    def _alive(expires, now):
+        return expires is None or expires > now
+
+    def _store(self, connection, key, value, expires, now):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        row = connection.execute(
+            'SELECT size FROM cache WHERE key = ?', (key,)).fetchone()
+        old_size = row[0] if row else 0
+        connection.execute(
+            'INSERT OR REPLACE INTO cache'
+            ' (key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?)',
+            (key, data, expires, now, len(data)))
+        self._change_total(connection, len(data) - old_size)
+        self._evict(connection, now, keep=key)
+
+    def _change_total(self, connection, delta):
+        if delta:
+            connection.execute(
+                'UPDATE cache_meta SET total = total + ? WHERE id = 1',
+                (delta,))
+
+    def _remove(self, connection, keys):
+        freed = 0
+        for key in keys:
+            row = connection.execute(
+                'SELECT size FROM cache WHERE key = ?', (key,)).fetchone()
+            if row:
+                connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+                freed += row[0]
+        self._change_total(connection, -freed)
+        return freed
+
+    def _remove_expired(self, connection, now):
+        # Оба запроса идут по индексу cache_expires, без обхода таблицы.
+        freed = connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM cache WHERE expires <= ?',
+            (now,)).fetchone()[0]
+        if freed:
+            connection.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+            self._change_total(connection, -freed)
+        return freed
+
+    def _evict(self, connection, now, keep):
+        total = connection.execute(
+            'SELECT total FROM cache_meta WHERE id = 1').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        total -= self._remove_expired(connection, now)
+        while total > self.max_bytes:
+            oldest = [key for key, in connection.execute(
+                'SELECT key FROM cache WHERE key != ?'
+                ' ORDER BY accessed, rowid LIMIT ?', (keep, EVICT_BATCH))]
+            if not oldest:
+                break
+            for key in oldest:
+                total -= self._remove(connection, [key])
+                if total <= self.max_bytes:
+                    break
+
+    def _touch_rows(self, keys, now):
+        self._write(lambda connection: connection.executemany(
+            'UPDATE cache SET accessed = ? WHERE key = ?',
+            [(now, key) for key in keys]))
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        full_keys = {}
+        for key in keys:
+            full_key = self.make_key(key, version=version)
+            self.validate_key(full_key)
+            full_keys[full_key] = key
+        now = time.time()
+        rows = []
+        chunk = list(full_keys)
+        while chunk:
+            # Старые сборки SQLite принимают не больше 999 параметров.
+            part, chunk = chunk[:MAX_PARAMS], chunk[MAX_PARAMS:]
+            rows.extend(self._connection.execute(
+                'SELECT key, value, expires, accessed FROM cache'
+                ' WHERE key IN ({})'.format(','.join('?' * len(part))),
+                part))
+        found = {}
+        stale = []
+        for full_key, data, expires, accessed in rows:
+            if not self._alive(expires, now):
+                continue
+            found[full_keys[full_key]] = pickle.loads(data)
+            if accessed < now - ACCESS_RESOLUTION:
+                stale.append(full_key)
+        if stale:
+            self._touch_rows(stale, now)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        items = []
+        for key, value in data.items():
+            full_key = self.make_key(key, version=version)
+            self.validate_key(full_key)
+            items.append((full_key, value))
+
+        def store(connection):
+            for full_key, value in items:
+                self._store(connection, full_key, value, expires, now)
+        self._write(store)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        full_key = self.make_key(key, version=version)
+        self.validate_key(full_key)
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+
+        def add(connection):
+            row = connection.execute(
+                'SELECT expires FROM cache WHERE key = ?',
+                (full_key,)).fetchone()
+            if row and self._alive(row[0], now):
+                return False
+            self._store(connection, full_key, value, expires, now)
+            return True
+        return self._write(add)
+
+    def incr(self, key, delta=1, version=None):
+        full_key = self.make_key(key, version=version)
+        self.validate_key(full_key)
+        now = time.time()
+
+        def incr(connection):
+            row = connection.execute(
+                'SELECT value, expires FROM cache WHERE key = ?',
+                (full_key,)).fetchone()
+            if row is None or not self._alive(row[1], now):
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            self._store(connection, full_key, value, row[1], now)
+            return value
+        return self._write(incr)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        full_key = self.make_key(key, version=version)
+        self.validate_key(full_key)
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+
+        def touch(connection):
+            return connection.execute(
+                'UPDATE cache SET expires = ?, accessed = ?'
+                ' WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (expires, now, full_key, now)).rowcount > 0
+        return self._write(touch)
+
+    def has_key(self, key, version=None):
+        full_key = self.make_key(key, version=version)
+        self.validate_key(full_key)
+        row = self._connection.execute(
+            'SELECT expires FROM cache WHERE key = ?',
+            (full_key,)).fetchone()
+        return bool(row) and self._alive(row[0], time.time())
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        full_keys = []
+        for key in keys:
+            full_key = self.make_key(key, version=version)
+            self.validate_key(full_key)
+            full_keys.append(full_key)
+        self._write(lambda connection: self._remove(connection, full_keys))
+
+    def clear(self):
+        def clear(connection):
+            connection.execute('DELETE FROM cache')
+            connection.execute('UPDATE cache_meta SET total = 0')
+        self._write(clear)
+
+    def close(self, **kwargs):
+        # Соединение переиспользуется между запросами, как и у LocMemCache.
+        pass
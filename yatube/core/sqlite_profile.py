@@ -0,0 +1,90 @@
+"""Продакшен-профиль SQLite: YATUBE_SQLITE_PROFILE=1.
+
+Профиль включает:
+
+* движок core.sqlite_backend с BEGIN IMMEDIATE для транзакций;
+* PRAGMA из PRAGMAS на каждом новом соединении (connection_created):
+  WAL, чтобы читатели не ждали писателя, synchronous=NORMAL, mmap,
+  busy_timeout и увеличенный кэш страниц;
+* постоянные соединения (CONN_MAX_AGE), чтобы PRAGMA и открытие
+  файла не повторялись в каждом запросе;
+* очередь записи run_serialized и serialized_write: потоки процесса
+  пишут по одному, а «database is locked» от соседних процессов
+  повторяется с нарастающей паузой вместо ошибки 500.
+
+Без профиля очередь записи ничего не делает.
+"""
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+from .middleware import SAFE_METHODS
+
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('mmap_size', 256 * 1024 * 1024),
+    ('busy_timeout', 5000),
+    # Отрицательное значение — размер в КиБ, а не в страницах.
+    ('cache_size', -64 * 1024),
+)
+WRITE_RETRIES = 5
+RETRY_DELAY = 0.05
+
+_write_queue = threading.Lock()
+
+
+def apply_pragmas(cursor):
+    for name, value in PRAGMAS:
+        cursor.execute(f'PRAGMA {name}={value}')
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Обработчик connection_created для соединений профиля."""
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor)
+
+
+def is_locked(error):
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def run_serialized(callback):
+    """Выполняет callback в очереди записи одной транзакцией.
+
+    При блокировке базы транзакция откатывается и callback
+    вызывается снова, поэтому в нём должны быть только записи в базу:
+    проверку форм и обработку картинок делайте до вызова. Без
+    SQLITE_PROFILE очереди и повторов нет, но транзакция остаётся:
+    записи сигналов не должны применяться наполовину.
+    """
+    if not getattr(settings, 'SQLITE_PROFILE', False):
+        with transaction.atomic():
+            return callback()
+    for attempt in range(WRITE_RETRIES):
+        try:
+            with _write_queue, transaction.atomic():
+                return callback()
+        except OperationalError as error:
+            if not is_locked(error) or attempt == WRITE_RETRIES - 1:
+                raise
+        time.sleep(RETRY_DELAY * 2 ** attempt)
+
+
+def serialized_write(view):
+    """Выполняет пишущий запрос к представлению в очереди записи.
+
+    Безопасные методы (показ формы) идут мимо очереди. Для
+    представлений с тяжёлой проверкой формы вызывайте run_serialized
+    вокруг сохранения.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return view(request, *args, **kwargs)
+        return run_serialized(lambda: view(request, *args, **kwargs))
+    return wrapper
@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+from multiprocessing import get_context
+
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from core.metrics import CACHE, LATENCY, REQUESTS, Registry, registry
+
+OBSERVATIONS: int = 100
+WORKERS: int = 3
+
+
+def observe(path):
+    worker_registry = Registry(path)
+    for _ in range(OBSERVATIONS):
+        worker_registry.inc(REQUESTS, (('view', 'shared'),))
+        worker_registry.observe(LATENCY, (('view', 'shared'),), 0.02)
+    worker_registry.flush()
+
+
+class RegistryTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'metrics.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_histogram_is_cumulative(self):
+        """Бакеты гистограммы накопительные и идут по возрастанию."""
+        local = Registry()
+        local.observe(LATENCY, (('view', 'v'),), 0.003)
+        local.observe(LATENCY, (('view', 'v'),), 0.2)
+        text = local.render()
+        self.assertIn(f'# TYPE {LATENCY} histogram', text)
+        self.assertIn(f'{LATENCY}_bucket{{view="v",le="0.005"}} 1', text)
+        self.assertIn(f'{LATENCY}_bucket{{view="v",le="0.25"}} 2', text)
+        self.assertIn(f'{LATENCY}_count{{view="v"}} 2', text)
+        buckets = [line for line in text.splitlines() if '_bucket' in line]
+        self.assertIn('le="+Inf"', buckets[-1])
+
+    def test_labels_are_escaped(self):
+        local = Registry()
+        local.inc(REQUESTS, (('view', 'a"b\\c'),))
+        self.assertIn('view="a\\"b\\\\c"', local.render())
+
+    def test_workers_are_aggregated(self):
+        """Метрики из нескольких процессов суммируются в общем файле."""
+        context = get_context('spawn')
+        processes = [context.Process(target=observe, args=(self.path,))
+                     for _ in range(WORKERS)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        text = Registry(self.path).render()
+        total = OBSERVATIONS * WORKERS
+        self.assertIn(f'{REQUESTS}{{view="shared"}} {total}', text)
+        self.assertIn(f'{LATENCY}_count{{view="shared"}} {total}', text)
+
+
+class MetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.client = Client()
+
+    def test_views_and_caches_are_counted(self):
+        """Запросы, SQL и кэш страниц попадают в /metrics."""
+        # Модели импортируются здесь: этот модуль грузят и дочерние
+        # процессы spawn из RegistryTest, где приложения не настроены.
+        from posts.models import Post, User
+        Post.objects.create(text='пост',
+                            author=User.objects.create(username='metrics'))
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn(
+            f'{REQUESTS}{{view="posts:index",method="GET",status="200"}} 2',
+            text)
+        self.assertIn(f'{LATENCY}_count{{view="posts:index"}} 2', text)
+        self.assertIn('yatube_sql_queries_total{view="posts:index"}', text)
+        self.assertIn(f'{CACHE}{{cache="page",result="hit"}} 1', text)
+        self.assertIn(f'{CACHE}{{cache="page",result="miss"}} 1', text)
+        self.assertIn(f'{CACHE}{{cache="fragment",result="miss"}} 1', text)
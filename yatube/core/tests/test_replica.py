@@ -0,0 +1,149 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from io import StringIO
+
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.db import connections
+from django.test import (RequestFactory, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+
+from core import routers
+from core.middleware import ReplicaPinMiddleware
+from posts.models import Comment, Post, User
+
+
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        routers.begin_request()
+        self.router = routers.ReplicaRouter()
+
+    def tearDown(self):
+        routers.reset()
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.router.db_for_read(Post),
+                         routers.REPLICA)
+
+    def test_writes_go_to_primary_and_pin(self):
+        """После записи чтения идут в основную базу."""
+        self.assertEqual(self.router.db_for_write(Comment),
+                         'default')
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_sessions_are_read_from_primary(self):
+        self.assertEqual(self.router.db_for_read(Session), 'default')
+
+    def test_reads_outside_request_go_to_primary(self):
+        """Фоновые потоки и команды читают из основной базы."""
+        routers.reset()
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_migrations_only_on_primary(self):
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+        self.assertFalse(self.router.allow_migrate(routers.REPLICA, 'posts'))
+
+
+class ReplicaPinMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = routers.ReplicaRouter()
+
+    def respond(self, request, write=False):
+        seen = {}
+
+        def view(request):
+            if write:
+                self.router.db_for_write(Comment)
+            seen['db'] = self.router.db_for_read(Post)
+            return HttpResponse()
+        response = ReplicaPinMiddleware(view)(request)
+        return response, seen['db']
+
+    def test_plain_read(self):
+        response, database = self.respond(self.factory.get('/'))
+        self.assertEqual(database, routers.REPLICA)
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_write_sets_pin_cookie(self):
+        """Подписка через GET тоже закрепляет пользователя за основной."""
+        response, database = self.respond(self.factory.get('/'), write=True)
+        self.assertEqual(database, 'default')
+        cookie = response.cookies[routers.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], routers.PIN_SECONDS)
+        self.assertFalse(routers.is_pinned())
+
+    def test_pin_cookie_reads_primary(self):
+        request = self.factory.get('/')
+        request.COOKIES[routers.PIN_COOKIE] = '1'
+        _, database = self.respond(request)
+        self.assertEqual(database, 'default')
+
+    def test_unsafe_method_reads_primary(self):
+        _, database = self.respond(self.factory.post('/'))
+        self.assertEqual(database, 'default')
+
+
+class SyncReplicaTest(TransactionTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.target = os.path.join(self.directory, 'replica.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_copy_is_readable(self):
+        """Копия базы открывается как обычный файл SQLite."""
+        author = User.objects.create(username='replicated')
+        Post.objects.create(text='на реплике', author=author)
+        call_command('sync_replica', target=self.target, stdout=StringIO())
+        replica = sqlite3.connect(self.target)
+        try:
+            rows = replica.execute(
+                'SELECT text FROM posts_post').fetchall()
+        finally:
+            replica.close()
+        self.assertEqual(rows, [('на реплике',)])
+        self.assertFalse(os.path.exists(f'{self.target}.tmp'))
+
+
+@override_settings(DATABASE_ROUTERS=['core.routers.ReplicaRouter'])
+class StaleReplicaTest(TransactionTestCase):
+    """Отставшая реплика — копия базы, снятая до записи."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, 'replica.sqlite3')
+        call_command('sync_replica', target=path, stdout=StringIO())
+        connections.databases[routers.REPLICA] = dict(
+            connections.databases['default'], NAME=path)
+        self.author = User.objects.create(username='fresh')
+        self.post = Post.objects.create(text='только что', author=self.author)
+
+    def tearDown(self):
+        connections[routers.REPLICA].close()
+        del connections.databases[routers.REPLICA]
+        delattr(connections._connections, routers.REPLICA)
+        routers.reset()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_request_reads_replica(self):
+        routers.begin_request()
+        self.assertIsNone(Post.objects.filter(pk=self.post.pk).first())
+
+    def test_background_thread_reads_primary(self):
+        """Поток после записи видит новый пост, а не отставшую реплику."""
+        found = []
+
+        def background():
+            found.append(Post.objects.filter(pk=self.post.pk).first())
+            connections.close_all()
+
+        thread = threading.Thread(target=background)
+        thread.start()
+        thread.join()
+        self.assertEqual(found, [self.post])
@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+import time
+from multiprocessing import get_context
+
+from django.test import SimpleTestCase
+
+from core.sqlite_cache import SQLiteCache
+
+INCREMENTS: int = 200
+WORKERS: int = 4
+
+
+def make_cache(path, **options):
+    return SQLiteCache(path, {'OPTIONS': options})
+
+
+def increment(path):
+    cache = make_cache(path)
+    for _ in range(INCREMENTS):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = make_cache(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_get_set_add_delete(self):
+        self.cache.set('a', {'value': 1})
+        self.assertEqual(self.cache.get('a'), {'value': 1})
+        self.assertFalse(self.cache.add('a', 2))
+        self.assertTrue(self.cache.add('b', 2))
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']),
+                         {'a': {'value': 1}, 'b': 2})
+        self.cache.delete('a')
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_ttl(self):
+        """Просроченные записи не отдаются."""
+        self.cache.set('short', 1, timeout=0.05)
+        self.cache.set('forever', 1, timeout=None)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertFalse(self.cache.has_key('short'))
+        self.assertEqual(self.cache.get('forever'), 1)
+
+    def test_lru_eviction_within_budget(self):
+        """При превышении объёма вытесняются давно читанные ключи."""
+        cache = make_cache(self.path, MAX_BYTES=4096)
+        payload = 'x' * 1000
+        cache.set('old', payload)
+        cache.set('used', payload)
+        cache._connection.execute(
+            "UPDATE cache SET accessed = 0 WHERE key LIKE '%old'")
+        for i in range(3):
+            cache.set(f'new{i}', payload)
+        self.assertIsNone(cache.get('old'))
+        self.assertEqual(cache.get('new2'), payload)
+        total = cache._connection.execute(
+            'SELECT total FROM cache_meta').fetchone()[0]
+        self.assertLessEqual(total, 4096)
+
+    def test_expired_keys_go_first(self):
+        """При полном кэше сначала удаляются истёкшие ключи."""
+        cache = make_cache(self.path, MAX_BYTES=4096)
+        payload = 'x' * 1000
+        cache.set('used', payload)
+        cache._connection.execute(
+            "UPDATE cache SET accessed = 0 WHERE key LIKE '%used'")
+        for i in range(3):
+            cache.set(f'short{i}', payload, timeout=0.05)
+        time.sleep(0.1)
+        cache.set('fresh', payload)
+        self.assertEqual(cache.get('used'), payload)
+        rows, size = cache._connection.execute(
+            'SELECT COUNT(*), SUM(size) FROM cache').fetchone()
+        total = cache._connection.execute(
+            'SELECT total FROM cache_meta').fetchone()[0]
+        self.assertEqual((rows, size), (2, total))
+
+    def test_expired_lookup_uses_index(self):
+        """Поиск истёкших ключей не обходит всю таблицу."""
+        for query in ('SELECT COALESCE(SUM(size), 0) FROM cache'
+                      ' WHERE expires <= ?',
+                      'DELETE FROM cache WHERE expires <= ?'):
+            plan = ' '.join(row[-1] for row in self.cache._connection.execute(
+                f'EXPLAIN QUERY PLAN {query}', (time.time(),)))
+            self.assertIn('cache_expires', plan)
+            self.assertNotIn('SCAN', plan)
+
+    def test_incr_is_shared_and_atomic(self):
+        """incr из нескольких процессов не теряет обновлений."""
+        self.cache.set('counter', 0)
+        context = get_context('spawn')
+        processes = [context.Process(target=increment, args=(self.path,))
+                     for _ in range(WORKERS)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.cache.get('counter'), INCREMENTS * WORKERS)
+
+    def test_incr_missing_key(self):
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
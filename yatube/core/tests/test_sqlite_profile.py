@@ -0,0 +1,164 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core import sqlite_profile
+from core.sqlite_backend.base import DatabaseWrapper
+from posts import images
+from posts.models import Follow, Post, User
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+class SQLiteProfileTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'db.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_pragmas(self):
+        """WAL и остальные PRAGMA применяются к соединению."""
+        database = sqlite3.connect(self.path)
+        try:
+            sqlite_profile.apply_pragmas(database)
+            self.assertEqual(
+                database.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            self.assertEqual(
+                database.execute('PRAGMA synchronous').fetchone()[0], 1)
+            self.assertEqual(
+                database.execute('PRAGMA busy_timeout').fetchone()[0], 5000)
+        finally:
+            database.close()
+
+    def test_transactions_take_write_lock(self):
+        """Транзакция профиля сразу блокирует запись другим."""
+        wrapper = DatabaseWrapper(dict(connection.settings_dict,
+                                       NAME=self.path), alias='profile')
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        try:
+            wrapper._start_transaction_under_autocommit()
+            with self.assertRaisesMessage(sqlite3.OperationalError,
+                                          'database is locked'):
+                other.execute('BEGIN IMMEDIATE')
+        finally:
+            other.close()
+            wrapper.close()
+
+
+class SerializedWriteTest(SimpleTestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        self.request = RequestFactory().post('/')
+        self.calls = 0
+
+    def flaky(self, failures, message='database is locked'):
+        def view(request):
+            self.calls += 1
+            if self.calls <= failures:
+                raise OperationalError(message)
+            return HttpResponse('ok')
+        return sqlite_profile.serialized_write(view)
+
+    @override_settings(SQLITE_PROFILE=True)
+    @mock.patch('core.sqlite_profile.time.sleep')
+    def test_locked_write_is_retried(self, sleep):
+        response = self.flaky(2)(self.request)
+        self.assertEqual(response.content, b'ok')
+        self.assertEqual(self.calls, 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    @override_settings(SQLITE_PROFILE=True)
+    @mock.patch('core.sqlite_profile.time.sleep')
+    def test_retries_are_limited(self, sleep):
+        with self.assertRaises(OperationalError):
+            self.flaky(sqlite_profile.WRITE_RETRIES)(self.request)
+        self.assertEqual(self.calls, sqlite_profile.WRITE_RETRIES)
+
+    @override_settings(SQLITE_PROFILE=True)
+    def test_other_errors_are_not_retried(self):
+        with self.assertRaises(OperationalError):
+            self.flaky(1, 'no such table: posts_post')(self.request)
+        self.assertEqual(self.calls, 1)
+
+    @override_settings(SQLITE_PROFILE=True)
+    def test_safe_methods_skip_queue(self):
+        """Показ формы не занимает очередь записи и транзакцию."""
+        def view(request):
+            self.assertFalse(sqlite_profile._write_queue.locked())
+            self.assertFalse(connection.in_atomic_block)
+            return HttpResponse('form')
+        sqlite_profile.serialized_write(view)(RequestFactory().get('/'))
+
+    @override_settings(SQLITE_PROFILE=False)
+    def test_disabled_without_profile(self):
+        with self.assertRaises(OperationalError):
+            self.flaky(1)(self.request)
+        self.assertEqual(self.calls, 1)
+
+
+@override_settings(SQLITE_PROFILE=True, MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SerializedPostFormTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_form_is_validated_outside_queue(self):
+        """Картинка обрабатывается до очереди записи, пост — в ней."""
+        user = User.objects.create_user(username='writer')
+        self.client.force_login(user)
+        locked = []
+        process = images.process
+
+        def spy(upload):
+            locked.append(sqlite_profile._write_queue.locked())
+            return process(upload)
+
+        with mock.patch('posts.images.process', spy):
+            self.client.post(reverse('posts:post_create'), {
+                'text': 'с картинкой',
+                'image': SimpleUploadedFile('small.gif', SMALL_GIF)})
+        self.assertEqual(locked, [False])
+        self.assertTrue(Post.objects.filter(author=user).exists())
+
+    def test_follow_links_write_in_queue(self):
+        """Подписка по GET-ссылке пишется в очереди одной транзакцией."""
+        reader = User.objects.create_user(username='reader')
+        author = User.objects.create_user(username='author')
+        self.client.force_login(reader)
+        states = []
+
+        def spy(sender, **kwargs):
+            states.append((sqlite_profile._write_queue.locked(),
+                           connection.in_atomic_block))
+        post_save.connect(spy, sender=Follow)
+        post_delete.connect(spy, sender=Follow)
+        self.addCleanup(post_save.disconnect, spy, sender=Follow)
+        self.addCleanup(post_delete.disconnect, spy, sender=Follow)
+        self.client.get(reverse('posts:profile_follow', args=['author']))
+        self.assertTrue(Follow.objects.filter(user=reader,
+                                              author=author).exists())
+        self.client.get(reverse('posts:profile_unfollow', args=['author']))
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(states, [(True, True), (True, True)])
@@ -0,0 +1,47 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from core import warmup
+from posts.models import Group, Post, User
+
+
+class WarmUpTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='описание')
+        Post.objects.create(text='пост', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_hot_paths(self):
+        self.assertEqual(warmup.hot_paths(), [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=('group',)),
+            reverse('posts:profile', args=('author',)),
+        ])
+
+    def test_pages_are_served_from_cache(self):
+        """После прогрева горячие страницы отдаются без запросов к базе."""
+        timings = warmup.warm_up(host='testserver')
+        self.assertEqual([name for name, _, _ in timings],
+                         ['templates', 'urls', 'connections', 'pages'])
+        self.assertEqual(dict((name, count) for name, _, count
+                              in timings)['pages'], 3)
+        with self.assertNumQueries(0):
+            self.client.get(reverse('posts:index'))
+
+    def test_all_templates_are_compiled(self):
+        self.assertGreater(warmup.compile_templates(), 10)
+
+    def test_command_reports_steps(self):
+        out = StringIO()
+        call_command('warm_up', host='testserver', stdout=out)
+        for step in ('templates', 'urls', 'connections', 'pages'):
+            self.assertIn(step, out.getvalue())
@@ -0,0 +1,131 @@
+"""Прогрев процесса перед первыми запросами.
+
+Сразу после деплоя каждый новый воркер компилирует шаблоны, строит
+разбор адресов и наполняет кэши на запросах живых пользователей.
+warm_up делает это заранее: компилирует все шаблоны из templates/,
+заполняет резолверы адресов, открывает соединения с базами и
+отрисовывает первые страницы ленты, самых больших групп и самых
+популярных авторов, чтобы они попали в кэш страниц и карточек.
+
+Вызывается командой warm_up или из yatube/wsgi.py по переменной
+YATUBE_WARMUP: «preload» — в мастер-процессе до fork (соединения
+с базой в конце закрываются, дочерним процессам их наследовать
+нельзя), любое другое значение — при старте воркера.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.db import connections
+from django.db.models import Count
+from django.template import engines
+from django.test import RequestFactory
+from django.urls import URLResolver, get_resolver, reverse
+
+TOP_GROUPS = 5
+TOP_PROFILES = 5
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+logger = logging.getLogger(__name__)
+
+
+def compile_templates():
+    """Загружает и компилирует все шаблоны из каталогов DIRS."""
+    count = 0
+    for engine in engines.all():
+        for directory in engine.engine.dirs:
+            for root, _, files in os.walk(directory):
+                for file in files:
+                    if not file.endswith(TEMPLATE_EXTENSIONS):
+                        continue
+                    name = os.path.relpath(os.path.join(root, file),
+                                           directory)
+                    engine.get_template(name.replace(os.sep, '/'))
+                    count += 1
+    return count
+
+
+def _populate(resolver):
+    # reverse_dict заполняет резолвер; вложенные заполняем сами.
+    count = len(resolver.reverse_dict)
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            count += _populate(pattern)
+    return count
+
+
+def populate_urls():
+    """Строит все резолверы адресов."""
+    return _populate(get_resolver())
+
+
+def open_connections():
+    """Открывает соединения со всеми базами."""
+    for alias in connections:
+        connections[alias].ensure_connection()
+    return len(connections.all())
+
+
+def hot_paths():
+    """Первые страницы ленты, самых больших групп и авторов."""
+    from posts.models import Group, UserStats
+
+    groups = (Group.objects.annotate(posts_total=Count('posts'))
+              .filter(posts_total__gt=0)
+              .order_by('-posts_total')
+              .values_list('slug', flat=True)[:TOP_GROUPS])
+    usernames = (UserStats.objects.filter(posts_count__gt=0)
+                 .order_by('-followers_count', '-posts_count')
+                 .values_list('user__username', flat=True)[:TOP_PROFILES])
+    return [
+        reverse('posts:index'),
+        *[reverse('posts:group_list', args=(slug,)) for slug in groups],
+        *[reverse('posts:profile', args=(username,))
+          for username in usernames],
+    ]
+
+
+def prefill_pages(host=None):
+    """Отрисовывает горячие страницы через все middleware.
+
+    Ключ кэша страницы зависит от хоста, поэтому host должен совпадать
+    с тем, по которому ходят пользователи.
+    """
+    host = host or settings.WARMUP_HOST
+    handler = BaseHandler()
+    handler.load_middleware()
+    factory = RequestFactory(HTTP_HOST=host)
+    count = 0
+    for path in hot_paths():
+        response = handler.get_response(factory.get(path))
+        if response.status_code == 200:
+            count += 1
+        else:
+            logger.warning('Прогрев %s: ответ %s', path,
+                           response.status_code)
+    return count
+
+
+def warm_up(host=None, preload=False):
+    """Выполняет все шаги прогрева и возвращает их длительности.
+
+    Результат — список (шаг, секунды, сколько обработано).
+    """
+    steps = [
+        ('templates', compile_templates),
+        ('urls', populate_urls),
+        ('connections', open_connections),
+        ('pages', lambda: prefill_pages(host)),
+    ]
+    timings = []
+    for name, step in steps:
+        started = time.perf_counter()
+        count = step()
+        elapsed = time.perf_counter() - started
+        timings.append((name, elapsed, count))
+        logger.info('Прогрев %s: %d за %.3f с', name, count, elapsed)
+    if preload:
+        connections.close_all()
+    return timings
@@ -0,0 +1,143 @@
+"""JSON API только для чтения: ленты и пост с комментариями.
+
+Страницы листаются курсором (after/before), поэтому глубина ленты
+не влияет ни на запрос, ни на ответ. Каждый ответ собирается
+фиксированным числом запросов: один на заголовок ленты (группа или
+автор со счётчиками) и один на страницу постов или комментариев.
+
+ETag строится из поколений page_cache и адреса запроса ещё до
+обращения к базе, так что условный запрос с совпавшим If-None-Match
+получает 304, не трогая ни базу, ни сериализацию.
+"""
+import hashlib
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import condition, require_safe
+
+from . import page_cache
+from .counters import get_stats
+from .models import Group, Post, User
+from .utils import (COMMENT_ORDERING, COMMENTS_PER_PAGE, KEYSET_ORDERING,
+                    POST_PER_PAGE, KeysetPaginator)
+
+
+def detail_scopes(post_id):
+    return [page_cache.post_scope(post_id), page_cache.ALL_GROUPS]
+
+
+def etag_for(scopes):
+    """etag_func для condition(): поколения областей плюс адрес."""
+    def etag(request, *args, **kwargs):
+        generations = page_cache.get_generations(scopes(*args, **kwargs))
+        raw = '|'.join([request.path, request.GET.urlencode(),
+                        *map(str, generations)])
+        return hashlib.md5(raw.encode()).hexdigest()
+    return etag
+
+
+def api_view(scopes):
+    def decorator(view):
+        return require_safe(condition(etag_func=etag_for(scopes))(view))
+    return decorator
+
+
+def _author(user):
+    return {'username': user.username, 'full_name': user.get_full_name()}
+
+
+def _group(group):
+    if group is None:
+        return None
+    return {'slug': group.slug, 'title': group.title}
+
+
+def serialize_post(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'updated_at': post.updated_at.isoformat(),
+        'author': _author(post.author),
+        'group': _group(post.group),
+        'image': post.image.url if post.image else None,
+        'url': reverse('posts:post_detail', args=(post.pk,)),
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
+
+
+def _link(request, name, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    query[name] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def _page(request, queryset, per_page, ordering, serialize):
+    page = KeysetPaginator(queryset, per_page, ordering).get_page(
+        after=request.GET.get('after'), before=request.GET.get('before'))
+    return {
+        'results': [serialize(obj) for obj in page.object_list],
+        'next': _link(request, 'after', page.next_cursor),
+        'previous': _link(request, 'before', page.previous_cursor),
+    }
+
+
+def _feed(request, post_list):
+    return _page(request, post_list, POST_PER_PAGE,
+                 KEYSET_ORDERING, serialize_post)
+
+
+def _json(data):
+    return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+
+
+@api_view(page_cache.index_scopes)
+def index(request):
+    return _json(_feed(request, Post.objects.for_list()))
+
+
+@api_view(page_cache.group_scopes)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    data = _feed(request, Post.objects.for_list().filter(group=group))
+    data['group'] = dict(_group(group), description=group.description)
+    return _json(data)
+
+
+@api_view(page_cache.profile_scopes)
+def profile(request, username):
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    stats = get_stats(author)
+    data = _feed(request, Post.objects.for_list().filter(author=author))
+    data['author'] = dict(
+        _author(author),
+        posts_count=stats.posts_count,
+        followers_count=stats.followers_count,
+        following_count=stats.following_count,
+    )
+    return _json(data)
+
+
+@api_view(detail_scopes)
+def post_detail(request, post_id):
+    post = get_object_or_404(Post.objects.with_related(), pk=post_id)
+    data = serialize_post(post)
+    data['comments_count'] = post.comments_count
+    data['comments'] = _page(request, post.comments.for_list(),
+                             COMMENTS_PER_PAGE, COMMENT_ORDERING,
+                             serialize_comment)
+    return _json(data)
@@ -0,0 +1,85 @@
+"""Условные GET для HTML-страниц поста, группы и профиля.
+
+Валидатор страницы получается до рендера одним запросом по индексу:
+для поста — позднейшее из его правки и свежего комментария, для
+группы и автора — дата свежего поста. ETag складывается из этой
+даты, поколений page_cache (они меняются и при правке или удалении
+старых постов, комментариев и подписок), адреса и пользователя, для
+которого рендерится страница. При совпадении If-None-Match ответ 304
+отдаётся без рендера.
+
+Last-Modified не отдаётся: дата не учитывает ни поколения, ни
+пользователя, а condition() отвечает на один If-Modified-Since
+по ней одной и вернул бы 304 на изменившуюся страницу.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import OuterRef, Subquery
+from django.views.decorators.http import condition
+
+from . import page_cache
+from .models import Comment, Post
+
+
+def _newest(posts):
+    return (posts.order_by('-pub_date', '-pk')
+            .values_list('pub_date', flat=True).first())
+
+
+def post_state(post_id):
+    """Время последнего изменения поста и области его автора."""
+    newest_comment = Comment.objects.filter(
+        post=OuterRef('pk'),
+    ).order_by('-created', '-pk').values('created')[:1]
+    row = Post.objects.filter(pk=post_id).values_list(
+        'updated_at', 'author__username', Subquery(newest_comment),
+    ).first()
+    if row is None:
+        return None, []
+    updated_at, username, commented = row
+    last_modified = max(updated_at, commented or updated_at)
+    # На странице поста есть счётчик постов автора.
+    return last_modified, [page_cache.post_scope(post_id),
+                           page_cache.author_scope(username),
+                           page_cache.ALL_GROUPS]
+
+
+def group_state(slug):
+    return (_newest(Post.objects.filter(group__slug=slug)),
+            page_cache.group_scopes(slug))
+
+
+def profile_state(username):
+    return (_newest(Post.objects.filter(author__username=username)),
+            page_cache.profile_scopes(username))
+
+
+def conditional_page(state):
+    """condition() с ETag из state(*args, **kwargs).
+
+    state возвращает время изменения и области страницы.
+    """
+    def etag(request, *args, **kwargs):
+        modified, scopes = state(*args, **kwargs)
+        generations = page_cache.get_generations(scopes)
+        raw = '|'.join([
+            request.path,
+            request.GET.urlencode(),
+            str(request.user.pk),
+            modified.isoformat() if modified else '',
+            *map(str, generations),
+        ])
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            # POST и прочие методы идут мимо валидаторов.
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            return conditional_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,68 @@
+"""Денормализованные счётчики постов, подписок и комментариев.
+
+Значения меняются атомарно через F-выражения в сигналах, поэтому
+представлениям не нужен COUNT(*) по большим таблицам.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, UserStats
+
+BATCH_SIZE = 1000
+
+User = get_user_model()
+
+
+def change_user(user_id, **deltas):
+    """Прибавляет deltas к счётчикам пользователя одним UPDATE."""
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    floors = {f'{field}__gte': -delta
+              for field, delta in deltas.items() if delta < 0}
+    stats = UserStats.objects.filter(user_id=user_id, **floors)
+    if stats.update(**changes) or floors:
+        return
+    if not User.objects.filter(pk=user_id).exists():
+        return
+    UserStats.objects.bulk_create([UserStats(user_id=user_id)],
+                                  ignore_conflicts=True)
+    UserStats.objects.filter(user_id=user_id).update(**changes)
+
+
+def change_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta)
+
+
+def get_stats(user):
+    """Счётчики пользователя; для новых пользователей — нули."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return UserStats(user=user)
+
+
+def _count(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(total=Count('pk')).values('total')
+    ), Value(0))
+
+
+def rebuild(user_model=User, stats_model=UserStats, post_model=Post,
+            comment_model=Comment, follow_model=Follow):
+    """Пересчитывает все счётчики по данным в таблицах."""
+    batch = []
+    for pk in user_model.objects.values_list('pk', flat=True).iterator():
+        batch.append(stats_model(user_id=pk))
+        if len(batch) == BATCH_SIZE:
+            stats_model.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    stats_model.objects.bulk_create(batch, ignore_conflicts=True)
+    stats_model.objects.update(
+        posts_count=_count(post_model.objects, 'author'),
+        followers_count=_count(follow_model.objects, 'author'),
+        following_count=_count(follow_model.objects, 'user'),
+    )
+    post_model.objects.update(
+        comments_count=_count(comment_model.objects, 'post'))
@@ -0,0 +1,64 @@
+"""Потоковая выгрузка постов в JSONL и CSV.
+
+Посты читаются через values_list().iterator(), без создания моделей
+и без загрузки всей выборки в память, а строки отдаются генератором:
+его потребляет и StreamingHttpResponse, и запись в файл. Поля те же,
+что понимает import_content, так что выгрузку можно загрузить обратно.
+"""
+import csv
+import json
+
+from .models import Post
+
+CHUNK_SIZE = 2000
+FIELDS = ('id', 'author', 'text', 'group', 'pub_date', 'image')
+COLUMNS = ('pk', 'author__username', 'text', 'group__slug', 'pub_date',
+           'image')
+
+
+def rows(queryset):
+    """Словари постов по возрастанию id, порциями по CHUNK_SIZE."""
+    values = queryset.order_by('pk').values_list(*COLUMNS).iterator(
+        chunk_size=CHUNK_SIZE)
+    for pk, author, text, group, pub_date, image in values:
+        yield {
+            'id': pk,
+            'author': author,
+            'text': text,
+            'group': group or '',
+            'pub_date': pub_date.isoformat(),
+            'image': image or '',
+        }
+
+
+def author_posts(author):
+    return Post.objects.filter(author=author)
+
+
+def group_posts(group):
+    return Post.objects.filter(group=group)
+
+
+def render_jsonl(items):
+    for item in items:
+        yield json.dumps(item, ensure_ascii=False) + '\n'
+
+
+class _Line:
+    """Файл для csv.writer, который просто возвращает записанное."""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(items):
+    writer = csv.writer(_Line())
+    yield writer.writerow(FIELDS)
+    for item in items:
+        yield writer.writerow([item[field] for field in FIELDS])
+
+
+FORMATS = {
+    'jsonl': (render_jsonl, 'application/x-ndjson; charset=utf-8'),
+    'csv': (render_csv, 'text/csv; charset=utf-8'),
+}
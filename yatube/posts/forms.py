@@ -1,4 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+
+from . import images
 from .models import Post, Comment
 
 
@@ -20,6 +23,24 @@ class PostForm(forms.ModelForm):
 
         return data
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        self.processed_image = None
+        if not isinstance(image, UploadedFile):
+            return image
+        self.processed_image = images.process(image)
+        return self.processed_image.file
+
+    def save(self, commit=True):
+        if 'image' in self.changed_data:
+            post, processed = self.instance, self.processed_image
+            if processed is None:
+                post.image_width = post.image_height = None
+            else:
+                post.image_width = processed.width
+                post.image_height = processed.height
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,99 @@
+"""Обработка картинок постов при загрузке.
+
+Сначала читается только заголовок файла: формат и размеры. Слишком
+большие по числу пикселей картинки («декомпрессионные бомбы»)
+отклоняются до декодирования. Небольшие картинки без метаданных
+сохраняются как есть, байт в байт. Остальные декодируются (JPEG —
+сразу в уменьшенном масштабе через draft), поворачиваются по EXIF,
+уменьшаются до MAX_SIDE и перекодируются без метаданных в JPEG, а при
+прозрачности — в PNG.
+
+Результат пишется во временные файлы на диске, а не в память,
+и уже оттуда копируется в хранилище.
+"""
+import os
+import tempfile
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from PIL import Image, ImageOps
+
+MAX_PIXELS = 40 * 1000 * 1000
+MAX_SIDE = 2048
+# Картинки не больше этого и без метаданных не перекодируются.
+KEEP_BYTES = 512 * 1024
+JPEG_QUALITY = 85
+FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP'}
+METADATA_KEYS = {'exif', 'icc_profile', 'xmp', 'XML:com.adobe.xmp',
+                 'comment', 'photoshop', 'iptc'}
+
+
+class ProcessedImage:
+    """Файл для сохранения в поле image и его размеры."""
+
+    def __init__(self, file, width, height):
+        self.file = file
+        self.width = width
+        self.height = height
+
+
+def _spool(suffix):
+    return tempfile.NamedTemporaryFile(suffix=suffix)
+
+
+def inspect(upload):
+    """Формат и размеры по заголовку, без декодирования пикселей."""
+    upload.seek(0)
+    try:
+        with Image.open(upload) as image:
+            image_format, size = image.format, image.size
+            metadata = METADATA_KEYS & set(image.info)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError('Файл не похож на картинку.')
+    if image_format not in FORMATS:
+        raise ValidationError('Поддерживаются JPEG, PNG, GIF и WebP.')
+    width, height = size
+    if width * height > MAX_PIXELS:
+        raise ValidationError(
+            f'Слишком большая картинка: {width}×{height} пикселей.')
+    return image_format, size, metadata
+
+
+def _has_alpha(image):
+    return (image.mode in ('RGBA', 'LA', 'PA')
+            or 'transparency' in image.info)
+
+
+def _encode(image, image_format, suffix, **options):
+    output = _spool(suffix)
+    image.save(output, image_format, **options)
+    output.seek(0)
+    return output
+
+
+def process(upload):
+    """Проверяет и готовит загруженную картинку к сохранению."""
+    image_format, (width, height), metadata = inspect(upload)
+    keep = (not metadata and max(width, height) <= MAX_SIDE
+            and upload.size <= KEEP_BYTES)
+    upload.seek(0)
+    with Image.open(upload) as image:
+        if image_format == 'JPEG':
+            image.draft('RGB', (MAX_SIDE, MAX_SIDE))
+        image.load()
+        if keep:
+            upload.seek(0)
+            return ProcessedImage(upload, width, height)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((MAX_SIDE, MAX_SIDE), Image.LANCZOS)
+        stem = os.path.splitext(os.path.basename(upload.name))[0]
+        if _has_alpha(image):
+            image = image.convert('RGBA')
+            output = _encode(image, 'PNG', '.png', optimize=True)
+            name = f'{stem}.png'
+        else:
+            image = image.convert('RGB')
+            output = _encode(image, 'JPEG', '.jpg', quality=JPEG_QUALITY,
+                             optimize=True, progressive=True)
+            name = f'{stem}.jpg'
+        return ProcessedImage(File(output, name=name), *image.size)
@@ -0,0 +1,249 @@
+"""Потоковый импорт постов, комментариев и подписок.
+
+Файл JSONL или CSV (можно .gz) читается построчно, имена
+пользователей и слаги групп разрешаются по словарям в памяти, строки
+пишутся bulk_create пачками, а транзакция фиксируется раз в chunk
+строк вместе со смещением в файле. Повторный запуск продолжает
+с последней зафиксированной позиции.
+
+Форматы строк:
+
+* posts: author, text, group (слаг), pub_date, image, id;
+* comments: post (id поста), author, text, created;
+* follows: user, author.
+
+Необязательны group, pub_date, image, id и created. Явный id поста
+сохраняет идентификаторы старой системы, на них и ссылаются
+комментарии.
+"""
+import csv
+import gzip
+import json
+import os
+from collections import Counter
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, ImportCheckpoint, Post, User
+
+MODELS = {'posts': Post, 'comments': Comment, 'follows': Follow}
+BATCH_SIZE = 1000
+CHUNK_SIZE = 20000
+
+
+class RowError(ValueError):
+    """Строку нельзя импортировать; причина попадает в отчёт."""
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Отключает auto_now у полей, чтобы bulk_create сохранил даты."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _lines(stream, position):
+    """Строки файла и смещение в байтах после каждой из них."""
+    for line in stream:
+        position += len(line)
+        yield line.decode('utf-8'), position
+
+
+def read_rows(path, offset=0):
+    """Словари строк файла и смещение, с которого читать следующую.
+
+    Файл открывается в двоичном режиме, поэтому смещение точное
+    и по нему можно вернуться через seek().
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    name = path[:-3] if path.endswith('.gz') else path
+    with opener(path, 'rb') as stream:
+        if name.endswith('.csv'):
+            header_line = stream.readline()
+            header = next(csv.reader([header_line.decode('utf-8-sig')]))
+            offset = max(offset, len(header_line))
+            stream.seek(offset)
+            lines = _lines(stream, offset)
+            position = offset
+
+            def text():
+                # csv.reader забирает строки по одной, поэтому после
+                # каждой записи position стоит на её конце.
+                nonlocal position
+                for line, position in lines:
+                    yield line
+            for record in csv.reader(text()):
+                if record:
+                    yield dict(zip(header, record)), position
+            return
+        stream.seek(offset)
+        for line, position in _lines(stream, offset):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row, position
+
+
+class Importer:
+    def __init__(self, kind, batch_size=BATCH_SIZE, chunk_size=CHUNK_SIZE,
+                 create_users=False):
+        if kind not in MODELS:
+            raise ValueError(f'Неизвестный тип импорта: {kind}')
+        self.kind = kind
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.create_users = create_users
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.imported = 0
+        self.skipped = Counter()
+        # Чьи ленты нужно дополнить после импорта: авторы постов
+        # или подписчики.
+        self.timeline_keys = set()
+        self.now = timezone.now()
+
+    @staticmethod
+    def source_for(kind, path):
+        return f'{kind}:{os.path.abspath(path)}'
+
+    def _required(self, row, field):
+        value = row.get(field)
+        if value in (None, ''):
+            raise RowError(f'нет поля {field}')
+        return value
+
+    def _user_id(self, username):
+        user_id = self.users.get(username)
+        if user_id is None:
+            if not self.create_users:
+                raise RowError('неизвестный пользователь')
+            user = User.objects.create(username=username,
+                                       password=make_password(None))
+            user_id = self.users[username] = user.pk
+        return user_id
+
+    def _date(self, value):
+        if not value:
+            return self.now
+        date = parse_datetime(value)
+        if date is None:
+            raise RowError('неверная дата')
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date)
+        return date
+
+    def build_posts(self, row):
+        group_id = None
+        if row.get('group'):
+            group_id = self.groups.get(row['group'])
+            if group_id is None:
+                raise RowError('неизвестная группа')
+        pub_date = self._date(row.get('pub_date'))
+        return Post(
+            id=int(row['id']) if row.get('id') else None,
+            text=self._required(row, 'text'),
+            author_id=self._user_id(self._required(row, 'author')),
+            group_id=group_id,
+            image=row.get('image') or '',
+            pub_date=pub_date,
+            updated_at=pub_date,
+        )
+
+    def build_comments(self, row):
+        return Comment(
+            post_id=int(self._required(row, 'post')),
+            author_id=self._user_id(self._required(row, 'author')),
+            text=self._required(row, 'text'),
+            created=self._date(row.get('created')),
+        )
+
+    def build_follows(self, row):
+        user_id = self._user_id(self._required(row, 'user'))
+        author_id = self._user_id(self._required(row, 'author'))
+        if user_id == author_id:
+            raise RowError('подписка на себя')
+        return Follow(user_id=user_id, author_id=author_id)
+
+    def _existing_posts(self, comments):
+        """Отбрасывает комментарии к постам, которых нет в базе."""
+        wanted = {comment.post_id for comment in comments}
+        found = set()
+        ids = list(wanted)
+        for start in range(0, len(ids), self.batch_size):
+            found.update(Post.objects.filter(
+                pk__in=ids[start:start + self.batch_size],
+            ).values_list('pk', flat=True))
+        kept = [comment for comment in comments if comment.post_id in found]
+        self.skipped['неизвестный пост'] += len(comments) - len(kept)
+        return kept
+
+    def _write(self, objects, checkpoint, position, rows):
+        model = MODELS[self.kind]
+        with transaction.atomic():
+            if self.kind == 'comments':
+                objects = self._existing_posts(objects)
+            if objects:
+                # Django 2.2 не ограничивает явный batch_size лимитом
+                # переменных SQLite, поэтому ограничиваем сами.
+                batch_size = min(self.batch_size, max(
+                    connection.ops.bulk_batch_size(
+                        model._meta.concrete_fields, objects), 1))
+                # Подписки и посты с явным id при повторе не дублируются.
+                model.objects.bulk_create(
+                    objects, batch_size=batch_size,
+                    ignore_conflicts=self.kind != 'comments')
+            checkpoint.offset = position
+            checkpoint.rows += rows
+            checkpoint.save(update_fields=['offset', 'rows', 'updated_at'])
+        self.imported += len(objects)
+        if self.kind == 'posts':
+            self.timeline_keys.update(post.author_id for post in objects)
+        elif self.kind == 'follows':
+            self.timeline_keys.update(follow.user_id for follow in objects)
+
+    def run(self, path, restart=False, progress=None):
+        """Импортирует файл; progress(rows, imported) после каждой порции."""
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+            source=self.source_for(self.kind, path))
+        if restart:
+            checkpoint.offset = checkpoint.rows = 0
+        build = getattr(self, f'build_{self.kind}')
+        pending = []
+        rows = 0
+        position = checkpoint.offset
+        with explicit_dates(Post._meta.get_field('pub_date'),
+                            Post._meta.get_field('updated_at'),
+                            Comment._meta.get_field('created')):
+            for row, position in read_rows(path, checkpoint.offset):
+                rows += 1
+                try:
+                    if not isinstance(row, dict):
+                        raise RowError('неверный формат строки')
+                    pending.append(build(row))
+                except ValueError as error:
+                    self.skipped[str(error) if isinstance(error, RowError)
+                                 else 'неверное значение'] += 1
+                if rows == self.chunk_size:
+                    self._write(pending, checkpoint, position, rows)
+                    pending, rows = [], 0
+                    if progress:
+                        progress(checkpoint.rows, self.imported)
+            if rows or restart:
+                self._write(pending, checkpoint, position, rows)
+                if progress:
+                    progress(checkpoint.rows, self.imported)
+        return checkpoint
@@ -0,0 +1,51 @@
+from contextlib import nullcontext
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template.loader import get_template
+
+from core.benchmarks import format_us, summarize, timed
+from posts.utils import POST_PER_PAGE
+
+TEMPLATE = 'posts/includes/paginator.html'
+
+
+def all_pages(paginator, number):
+    """Прежнее поведение: номера всех страниц."""
+    return paginator.page_range
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает размер HTML и время отрисовки навигации по '
+            'страницам со всеми номерами и с окном вокруг текущей.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        template = get_template(TEMPLATE)
+        # Вместо запроса к базе — range: пагинатору нужны только len
+        # и срезы.
+        posts = range(options['posts'])
+        paginator = Paginator(posts, POST_PER_PAGE)
+        page = paginator.get_page(paginator.num_pages // 2)
+        full = mock.patch('posts.templatetags.pagination.elided_page_range',
+                          all_pages)
+        results = []
+        for name, patch in (('все номера', full), ('окно', nullcontext())):
+            with patch:
+                html = template.render({'page_obj': page})
+                stats = summarize(timed(
+                    lambda: template.render({'page_obj': page}),
+                    options['repeat']))
+            results.append((len(html.encode()), stats['p50']))
+            self.stdout.write(
+                f'{name:>11}: {len(html.encode()):10d} байт, '
+                f'p50={format_us(stats["p50"])} '
+                f'p95={format_us(stats["p95"])}')
+        (full_size, full_time), (size, render) = results
+        self.stdout.write(self.style.SUCCESS(
+            f'HTML меньше в {full_size / size:.0f} раз, отрисовка быстрее '
+            f'в {full_time / render:.0f} раз'))
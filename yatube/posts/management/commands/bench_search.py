@@ -0,0 +1,113 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+
+from core.benchmarks import format_us, summarize, timed
+from posts import search
+from posts.models import Post, User
+
+BENCH_USERNAME = 'bench_search'
+# Слова, которых нет в словаре Faker: редкое встречается в RARE_POSTS
+# самых старых постах, отсутствующее — нигде.
+RARE_TOKEN = 'зеленоглазка'
+MISSING_TOKEN = 'несуществующееслово'
+RARE_POSTS = 3
+MIN_POSTS = 1000
+SAMPLE_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает поиск через icontains и через индекс FTS5 на '
+            'текущей базе: частые, редкие и отсутствующие слова и '
+            'глубокие страницы. Вызывает search() и filter_posts().')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--deep-page', type=int, default=20)
+
+    def common_word(self):
+        """Самое частое слово выборки постов."""
+        words = Counter()
+        texts = Post.objects.values_list('text', flat=True)[:SAMPLE_SIZE]
+        for text in texts:
+            words.update(word.lower() for word in search.TOKEN_RE.findall(
+                text) if len(word) > 3)
+        return words.most_common(1)[0][0]
+
+    def plant(self):
+        """Посты с редким словом — старше всех остальных.
+
+        Так icontains с сортировкой по дате проходит всю таблицу, как
+        и при поиске редкого слова в настоящих данных.
+        """
+        author, _ = User.objects.get_or_create(username=BENCH_USERNAME)
+        oldest = Post.objects.aggregate(oldest=Min('pub_date'))['oldest']
+        for i in range(RARE_POSTS):
+            post = Post.objects.create(
+                text=f'{RARE_TOKEN} номер {i}', author=author)
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=oldest - timedelta(days=i + 1))
+        return author
+
+    def cursor_at(self, page, query, fetch):
+        after = None
+        for _ in range(page - 1):
+            _, after = fetch(query, after)
+            if after is None:
+                break
+        return after
+
+    def ranked(self):
+        """search() на FTS5 и его же запасной путь через icontains."""
+        def fts(query, after=None):
+            return search.search(query, after=after)
+
+        def icontains(query, after=None):
+            return search._search_icontains(
+                query, None, None, after, search.SEARCH_PER_PAGE)
+        return (('icontains', icontains), ('fts5', fts))
+
+    def filtered(self):
+        """filter_posts() (админка) против icontains."""
+        def fts(query, after=None):
+            return list(search.filter_posts(
+                Post.objects.order_by('-pub_date'),
+                query)[:search.SEARCH_PER_PAGE]), None
+
+        def icontains(query, after=None):
+            return list(Post.objects.order_by('-pub_date').filter(
+                text__icontains=query)[:search.SEARCH_PER_PAGE]), None
+        return (('icontains', icontains), ('fts5', fts))
+
+    def measure(self, case, query, implementations, repeat, page=1):
+        for name, fetch in implementations:
+            after = self.cursor_at(page, query, fetch) if page > 1 else None
+            found = len(fetch(query, after)[0])
+            stats = summarize(timed(lambda: fetch(query, after), repeat))
+            self.stdout.write(
+                f'{case:32} {name:10} найдено={found:2d} '
+                f'p50={format_us(stats["p50"])} '
+                f'p95={format_us(stats["p95"])}')
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('Поиск FTS5 есть только на SQLite.')
+        if Post.objects.count() < MIN_POSTS:
+            raise CommandError('Мало данных, запустите seed_data.')
+        repeat = options['repeat']
+        common = self.common_word()
+        author = self.plant()
+        try:
+            for case, query in ((f'частое «{common}»', common),
+                                ('редкое', RARE_TOKEN),
+                                ('отсутствующее', MISSING_TOKEN)):
+                self.measure(f'search: {case}', query, self.ranked(),
+                             repeat)
+                self.measure(f'filter_posts: {case}', query,
+                             self.filtered(), repeat)
+            self.measure(f'search: стр. {options["deep_page"]}', common,
+                         self.ranked(), repeat, page=options['deep_page'])
+        finally:
+            author.delete()
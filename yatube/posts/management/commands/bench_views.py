@@ -0,0 +1,149 @@
+import json
+import platform
+import time
+
+import django
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.benchmarks import format_us, summarize
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+from posts.urls import app_name, urlpatterns
+
+# Эти адреса пишут в базу даже по GET: прогон менял бы данные
+# (подписки и ленты читателя), и соседние прогоны нельзя было бы
+# сравнить.
+MUTATING_ROUTES = {'profile_follow', 'profile_unfollow'}
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет все адреса posts/urls.py через тестовый клиент '
+            'и сохраняет задержки, число запросов и пропускную '
+            'способность в JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кэш перед каждым запросом.')
+        parser.add_argument('--anonymous', action='store_true')
+        parser.add_argument('--output', default='bench_views.json')
+        parser.add_argument('--compare', default=None,
+                            help='JSON прошлого прогона для сравнения.')
+
+    def sample(self):
+        """Самые нагруженные объекты: худший случай для страниц."""
+        stats = UserStats.objects.select_related('user')
+        author = stats.order_by('-posts_count').first()
+        reader = stats.order_by('-following_count').first()
+        post = (Post.objects.filter(author=author.user)
+                .order_by('-comments_count').first()
+                if author else None)
+        group = Group.objects.filter(posts__isnull=False).first()
+        if not (author and reader and post and group):
+            raise CommandError('Мало данных, запустите seed_data.')
+        return {
+            'slug': group.slug,
+            'username': author.user.username,
+            'post_id': post.pk,
+        }, reader.user
+
+    def routes(self, kwargs):
+        for pattern in urlpatterns:
+            name = pattern.name
+            if name is None or name in MUTATING_ROUTES:
+                # Раздача медиа в DEBUG — не страница приложения.
+                # Пишущие адреса исказили бы данные.
+                continue
+            arguments = {key: kwargs[key]
+                         for key in pattern.pattern.converters}
+            yield name, reverse(f'{app_name}:{name}', kwargs=arguments)
+
+    def measure(self, client, url, options):
+        for _ in range(options['warmup']):
+            client.get(url)
+        latencies = []
+        queries = []
+        statuses = set()
+        for _ in range(options['requests']):
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    # Выгрузка строится по мере чтения: без него не было
+                    # бы ни времени, ни запросов.
+                    for _ in response.streaming_content:
+                        pass
+                latencies.append(time.perf_counter() - started)
+            queries.append(len(context))
+            statuses.add(response.status_code)
+        total = sum(latencies)
+        return {
+            'url': url,
+            'status': sorted(statuses),
+            'latency': summarize(latencies),
+            'queries': {'mean': sum(queries) / len(queries),
+                        'max': max(queries)},
+            'throughput': len(latencies) / total if total else 0.0,
+        }
+
+    def compare(self, results, path):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)['routes']
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            before = baseline[name]['latency']['p50']
+            after = result['latency']['p50']
+            change = (after - before) / before * 100 if before else 0.0
+            self.stdout.write(f'{name:16} p50 {format_us(before)} -> '
+                              f'{format_us(after)} ({change:+.1f}%)')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должно быть больше нуля.')
+        kwargs, reader = self.sample()
+        client = Client()
+        if not options['anonymous']:
+            client.force_login(reader)
+        results = {}
+        for name, url in self.routes(kwargs):
+            result = self.measure(client, url, options)
+            results[name] = result
+            latency = result['latency']
+            self.stdout.write(
+                f'{name:16} p50={format_us(latency["p50"])} '
+                f'p95={format_us(latency["p95"])} '
+                f'p99={format_us(latency["p99"])} '
+                f'запросов={result["queries"]["mean"]:.1f} '
+                f'{result["throughput"]:.0f} rps')
+        report = {
+            'created': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+            },
+            'options': {key: options[key] for key in
+                        ('requests', 'warmup', 'cold', 'anonymous')},
+            'dataset': {
+                'users': User.objects.count(),
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+            'routes': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты сохранены в {options["output"]}.'))
+        if options['compare']:
+            self.compare(results, options['compare'])
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import page_cache, write_behind
+from posts.models import Comment, Post, User
+
+BENCH_USERNAME = 'bench_write_behind'
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает прямую запись комментариев с отложенной '
+            '(write-behind) на текущей базе. Тестовые данные удаляются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writes', type=int, default=2000)
+
+    def direct(self, post, author, writes):
+        started = time.perf_counter()
+        for i in range(writes):
+            # Как add_comment: своя транзакция на каждый комментарий.
+            with transaction.atomic():
+                Comment.objects.create(post=post, author=author,
+                                       text=f'прямо {i}')
+        elapsed = time.perf_counter() - started
+        return elapsed, elapsed, writes
+
+    def queued(self, queue, post, author, writes):
+        started = time.perf_counter()
+        for i in range(writes):
+            queue.push(write_behind.COMMENT, author.pk, post.pk,
+                       f'отложенно {i}')
+            page_cache.bump(page_cache.post_scope(post.pk))
+        enqueued = time.perf_counter() - started
+        commits = 0
+        while write_behind.flush(queue):
+            commits += 1
+        return enqueued, time.perf_counter() - started, commits
+
+    def report(self, name, writes, request_time, total_time, commits):
+        self.stdout.write(
+            f'{name:>11}: запрос {writes / request_time:9.0f} записей/с, '
+            f'до базы {writes / total_time:9.0f} записей/с, '
+            f'транзакций {commits}')
+
+    def handle(self, *args, **options):
+        writes = options['writes']
+        author, _ = User.objects.get_or_create(username=BENCH_USERNAME)
+        post = Post.objects.create(text='бенчмарк write-behind',
+                                   author=author)
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                queue = write_behind.WriteBehindQueue(
+                    os.path.join(directory, 'queue.sqlite3'))
+                direct = self.direct(post, author, writes)
+                queued = self.queued(queue, post, author, writes)
+            post.refresh_from_db(fields=['comments_count'])
+            if post.comments_count != 2 * writes:
+                self.stdout.write(self.style.ERROR(
+                    f'Счётчик комментариев {post.comments_count}, '
+                    f'ожидалось {2 * writes}'))
+        finally:
+            author.delete()
+        self.report('прямо', writes, *direct)
+        self.report('write-behind', writes, *queued)
+        self.stdout.write(self.style.SUCCESS(
+            f'Ускорение: в запросе {direct[0] / queued[0]:.1f}x, '
+            f'до базы {direct[1] / queued[1]:.1f}x, транзакций меньше '
+            f'в {direct[2] / max(queued[2], 1):.0f} раз'))
@@ -0,0 +1,104 @@
+import inspect
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from posts import timeline
+from posts.models import Follow, Group, Post
+from posts.utils import KeysetPaginator
+
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+class Command(BaseCommand):
+    help = ('Печатает EXPLAIN QUERY PLAN для запросов каждой страницы '
+            'и отмечает сортировки во временном B-дереве.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Завершиться с ошибкой, если есть временные сортировки.')
+
+    def routes(self):
+        """Адреса страниц с данными из текущей базы.
+
+        Третий элемент — допустима ли на странице временная сортировка:
+        выдачу поиска по релевантности без неё не отсортировать.
+        """
+        post = Post.objects.order_by('-pub_date', '-pk').first()
+        group = Group.objects.filter(posts__isnull=False).first()
+        follow = Follow.objects.select_related('user').first()
+        if post is None:
+            return [(reverse('posts:index'), None, False)]
+        routes = []
+        after = '?after=' + KeysetPaginator(
+            Post.objects.all(), 1).cursor_for(post)
+        pages = [reverse('posts:index'),
+                 reverse('posts:profile', args=[post.author.username])]
+        if group is not None:
+            pages.append(reverse('posts:group_list', args=[group.slug]))
+        for url in pages:
+            routes += [(url, None, False), (url + '?page=2', None, False),
+                       (url + after, None, False)]
+        routes += [
+            (reverse('posts:post_detail', args=[post.pk]), None, False),
+            (reverse('posts:search') + '?'
+             + urlencode({'q': post.text[:20]}), None, True),
+        ]
+        if follow is not None:
+            url = reverse('posts:follow_index')
+            feed = timeline.feed(follow.user)
+            feed_after = '?after=' + KeysetPaginator(
+                feed, 1, timeline.FEED_ORDERING).cursor_for(feed[0])
+            routes += [(url, follow.user, False),
+                       (url + feed_after, follow.user, False)]
+        return routes
+
+    def capture(self, url, user):
+        """SQL и параметры всех запросов страницы."""
+        request = RequestFactory().get(url)
+        request.user = user or AnonymousUser()
+        match = resolve(request.path_info)
+        # Снимаем кэш страниц и login_required: нужны сами запросы.
+        view = inspect.unwrap(match.func)
+        queries = []
+
+        def wrapper(execute, sql, params, many, context):
+            queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(wrapper):
+            view(request, *match.args, **match.kwargs)
+        return queries
+
+    def explain(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда разбирает планы только SQLite.')
+        sorts = 0
+        for url, user, sort_allowed in self.routes():
+            self.stdout.write(self.style.MIGRATE_HEADING(url))
+            for sql, params in self.capture(url, user):
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                self.stdout.write(f'  {sql[:120]}')
+                for line in self.explain(sql, params):
+                    if TEMP_SORT in line and not sort_allowed:
+                        sorts += 1
+                        line = self.style.WARNING(line)
+                    self.stdout.write(f'    {line}')
+        if sorts:
+            message = f'Временных сортировок: {sorts}.'
+            if options['strict']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS('Временных сортировок нет.'))
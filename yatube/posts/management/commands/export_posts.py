@@ -0,0 +1,62 @@
+import gzip
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exporter
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает посты автора, группы или все посты '
+            'в JSONL или CSV, при желании сразу сжимая gzip.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('output')
+        source = parser.add_mutually_exclusive_group()
+        source.add_argument('--author')
+        source.add_argument('--group')
+        parser.add_argument('--format', choices=sorted(exporter.FORMATS),
+                            default=None,
+                            help='По умолчанию — по расширению файла.')
+        parser.add_argument('--gzip', action='store_true',
+                            help='Сжимать; включается и для имён на .gz.')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        compress = options['gzip'] or output.endswith('.gz')
+        name = output[:-3] if output.endswith('.gz') else output
+        export_format = options['format'] or (
+            'csv' if name.endswith('.csv') else 'jsonl')
+        try:
+            if options['author']:
+                posts = exporter.author_posts(
+                    User.objects.get(username=options['author']))
+            elif options['group']:
+                posts = exporter.group_posts(
+                    Group.objects.get(slug=options['group']))
+            else:
+                posts = Post.objects.all()
+        except (User.DoesNotExist, Group.DoesNotExist):
+            raise CommandError('Автор или группа не найдены.')
+        render_rows, _ = exporter.FORMATS[export_format]
+        opener = gzip.open if compress else open
+        started = time.perf_counter()
+        count = 0
+
+        def counted(items):
+            nonlocal count
+            for item in items:
+                count += 1
+                yield item
+
+        try:
+            with opener(output, 'wt', encoding='utf-8', newline='') as file:
+                for chunk in render_rows(counted(exporter.rows(posts))):
+                    file.write(chunk)
+        except OSError as error:
+            raise CommandError(error)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено {count} постов в {output} за {elapsed:.1f} с '
+            f'({count / elapsed if elapsed else 0:,.0f} строк/с).'))
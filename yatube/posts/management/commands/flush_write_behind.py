@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import write_behind
+
+
+class Command(BaseCommand):
+    help = 'Применяет отложенные комментарии и подписки из очереди.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Сбрасывать очередь с этим интервалом, '
+                                 'секунд, пока команду не остановят.')
+
+    def handle(self, *args, **options):
+        queue = write_behind.get_queue()
+        if queue is None:
+            raise CommandError('Очередь не настроена: задайте '
+                               'YATUBE_WRITE_BEHIND.')
+        while True:
+            applied = write_behind.drain(queue)
+            if applied or not options['interval']:
+                self.stdout.write(f'Применено записей: {applied}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
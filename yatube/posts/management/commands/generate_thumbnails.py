@@ -0,0 +1,39 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import django
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+CHUNK_SIZE = 500
+
+
+def prepare(row):
+    thumbnails.prepare(*row)
+
+
+class Command(BaseCommand):
+    help = ('Готовит миниатюры и варианты для srcset для всех картинок '
+            'постов параллельно.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').order_by('pk').values_list(
+            'pk', 'image').iterator(chunk_size=CHUNK_SIZE)
+        started = time.perf_counter()
+        done = 0
+        # spawn, а не fork: дочерние процессы не должны наследовать
+        # открытое соединение с базой.
+        with ProcessPoolExecutor(max_workers=options['workers'],
+                                 mp_context=get_context('spawn'),
+                                 initializer=django.setup) as pool:
+            for _ in pool.map(prepare, posts, chunksize=16):
+                done += 1
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {done} за {elapsed:.1f} с.'))
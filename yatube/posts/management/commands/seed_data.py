@@ -0,0 +1,215 @@
+import random
+import time
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+from mixer.backend.django import mixer
+from PIL import Image
+
+from posts import counters, timeline
+from posts.importer import explicit_dates
+from posts.models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 5000
+TEXT_POOL = 1000
+IMAGE_POOL = 20
+MAX_COMMENTS = 500
+# Показатель степенного закона: чем больше, тем сильнее популярность
+# сосредоточена у первых авторов.
+ALPHA = 1.2
+
+
+def power_law_weights(size, alpha=ALPHA):
+    """Накопленные веса рангов 1..size для random.choices."""
+    total = 0.0
+    weights = []
+    for rank in range(1, size + 1):
+        total += rank ** -alpha
+        weights.append(total)
+    return weights
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу правдоподобными данными: пользователи, '
+            'группы, посты, подписки по степенному закону, комментарии '
+            'и картинки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Среднее число подписок пользователя.')
+        parser.add_argument('--comments', type=float, default=3,
+                            help='Среднее число комментариев поста.')
+        parser.add_argument('--images', type=float, default=0.1,
+                            help='Доля постов с картинкой.')
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--prefix', default='seed')
+
+    def report(self, name, rows, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{name:10} {rows:>10} строк за {elapsed:7.1f} с '
+            f'({rows / elapsed if elapsed else 0:,.0f} строк/с)')
+
+    def create_users(self, number, prefix, fake):
+        started = time.perf_counter()
+        password = make_password(None)
+        for start in range(0, number, BATCH_SIZE):
+            User.objects.bulk_create([
+                User(username=f'{prefix}_user_{i}', password=password,
+                     first_name=fake.first_name(),
+                     last_name=fake.last_name())
+                for i in range(start, min(start + BATCH_SIZE, number))
+            ], ignore_conflicts=True)
+        self.report('users', number, started)
+        return list(User.objects.filter(
+            username__startswith=f'{prefix}_user_',
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def create_groups(self, number, prefix):
+        started = time.perf_counter()
+        existing = Group.objects.filter(
+            slug__startswith=f'{prefix}-group-').count()
+        if existing < number:
+            mixer.cycle(number - existing).blend(
+                Group,
+                slug=mixer.sequence(
+                    lambda i: f'{prefix}-group-{existing + i}'),
+                title=mixer.faker.catch_phrase,
+                description=mixer.faker.text,
+            )
+        self.report('groups', number, started)
+        return list(Group.objects.filter(
+            slug__startswith=f'{prefix}-group-',
+        ).values_list('pk', flat=True))
+
+    def create_images(self, number, prefix):
+        names = []
+        for i in range(number):
+            name = f'posts/{prefix}_{i}.jpg'
+            if not default_storage.exists(name):
+                buffer = BytesIO()
+                size = (random.randint(400, 1600), random.randint(300, 1200))
+                color = tuple(random.randrange(256) for _ in range(3))
+                Image.new('RGB', size, color).save(buffer, 'JPEG')
+                name = default_storage.save(
+                    name, ContentFile(buffer.getvalue()))
+            names.append(name)
+        return names
+
+    def create_follows(self, user_ids, mean):
+        """Подписки: популярность авторов по степенному закону."""
+        started = time.perf_counter()
+        weights = power_law_weights(len(user_ids))
+        total = 0
+        batch = []
+        for user_id in user_ids:
+            wanted = min(len(user_ids) - 1,
+                         int(random.expovariate(1 / mean)) if mean else 0)
+            authors = set(random.choices(user_ids, cum_weights=weights,
+                                         k=wanted))
+            authors.discard(user_id)
+            batch.extend(Follow(user_id=user_id, author_id=author_id)
+                         for author_id in authors)
+            if len(batch) >= BATCH_SIZE:
+                total += len(batch)
+                Follow.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        total += len(batch)
+        Follow.objects.bulk_create(batch, ignore_conflicts=True)
+        self.report('follows', total, started)
+
+    def comment_count(self, mean):
+        # Pareto с показателем 1.5: у X - 1 среднее 2 и тяжёлый хвост.
+        return min(MAX_COMMENTS,
+                   int((random.paretovariate(1.5) - 1) * mean / 2))
+
+    def create_posts(self, options, user_ids, group_ids, images, texts):
+        started = time.perf_counter()
+        number = options['posts']
+        weights = power_law_weights(len(user_ids))
+        now = timezone.now()
+        span = timedelta(days=options['days'])
+        step = span / max(number, 1)
+        first = now - span
+        comments_total = 0
+        for start in range(0, number, BATCH_SIZE):
+            size = min(BATCH_SIZE, number - start)
+            authors = random.choices(user_ids, cum_weights=weights, k=size)
+            posts = []
+            for offset, author_id in enumerate(authors):
+                # Даты растут вместе с id, как на настоящем сайте.
+                pub_date = first + step * (start + offset + random.random())
+                posts.append(Post(
+                    text=random.choice(texts),
+                    author_id=author_id,
+                    group_id=(random.choice(group_ids)
+                              if group_ids and random.random() < 0.7
+                              else None),
+                    image=(random.choice(images)
+                           if images and random.random() < options['images']
+                           else ''),
+                    pub_date=pub_date,
+                    updated_at=pub_date,
+                ))
+            with transaction.atomic():
+                last_id = Post.objects.order_by('-pk').values_list(
+                    'pk', flat=True).first() or 0
+                Post.objects.bulk_create(posts)
+                comments = []
+                for post_id, pub_date in Post.objects.filter(
+                        pk__gt=last_id).values_list('pk', 'pub_date'):
+                    for _ in range(self.comment_count(options['comments'])):
+                        comments.append(Comment(
+                            post_id=post_id,
+                            author_id=random.choice(user_ids),
+                            text=random.choice(texts)[:200],
+                            created=pub_date + timedelta(
+                                minutes=random.randint(1, 60 * 24 * 7)),
+                        ))
+                Comment.objects.bulk_create(comments)
+            comments_total += len(comments)
+        self.report('posts', number, started)
+        self.stdout.write(f'{"comments":10} {comments_total:>10} строк')
+
+    def handle(self, *args, **options):
+        if options['seed'] is not None:
+            random.seed(options['seed'])
+            Faker.seed(options['seed'])
+        fake = Faker('ru_RU')
+        prefix = options['prefix']
+        user_ids = self.create_users(options['users'], prefix, fake)
+        group_ids = self.create_groups(options['groups'], prefix)
+        texts = [fake.text(max_nb_chars=random.choice((80, 300, 1200)))
+                 for _ in range(TEXT_POOL)]
+        images = (self.create_images(IMAGE_POOL, prefix)
+                  if options['images'] else [])
+        self.create_follows(user_ids, options['follows'])
+        with explicit_dates(Post._meta.get_field('pub_date'),
+                            Post._meta.get_field('updated_at'),
+                            Comment._meta.get_field('created')):
+            self.create_posts(options, user_ids, group_ids, images, texts)
+
+        # bulk_create не шлёт сигналов: счётчики и ленты собираем заново.
+        # Одна транзакция вместо коммита на каждую пачку строк.
+        started = time.perf_counter()
+        with transaction.atomic():
+            counters.rebuild()
+        self.report('counters', len(user_ids), started)
+        started = time.perf_counter()
+        with transaction.atomic():
+            timeline.rebuild()
+        self.report('timelines', len(user_ids), started)
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS('Данные созданы.'))
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:30
+
+from django.db import migrations
+
+
+def install_search(apps, schema_editor):
+    from posts import search
+    search.install(schema_editor.connection)
+    search.rebuild(schema_editor.connection)
+
+
+def uninstall_search(apps, schema_editor):
+    from posts import search
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_image_size'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Rendition',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20, verbose_name='Вариант')),
+                ('source', models.CharField(max_length=100, verbose_name='Исходная картинка')),
+                ('file', models.CharField(max_length=255, verbose_name='Файл')),
+                ('url', models.CharField(max_length=500, verbose_name='URL')),
+                ('webp_file', models.CharField(blank=True, max_length=255, verbose_name='Файл WebP')),
+                ('webp_url', models.CharField(blank=True, max_length=500, verbose_name='URL WebP')),
+                ('width', models.PositiveIntegerField(verbose_name='Ширина')),
+                ('height', models.PositiveIntegerField(verbose_name='Высота')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Вариант картинки',
+                'verbose_name_plural': 'Варианты картинок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='rendition',
+            constraint=models.UniqueConstraint(fields=('post', 'name'), name='unique_rendition'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def fill_timelines(apps, schema_editor):
+    from posts.timeline import rebuild
+    rebuild(
+        follow_model=apps.get_model('posts', 'Follow'),
+        post_model=apps.get_model('posts', 'Post'),
+        entry_model=apps.get_model('posts', 'TimelineEntry'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_rendition'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
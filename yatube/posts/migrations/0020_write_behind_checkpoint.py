@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_backfill_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WriteBehindCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=500, unique=True, verbose_name='Очередь')),
+                ('last_id', models.BigIntegerField(default=0, verbose_name='Последняя строка')),
+                ('rows', models.BigIntegerField(default=0, verbose_name='Применено строк')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Точка отложенной записи',
+                'verbose_name_plural': 'Точки отложенной записи',
+            },
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.db.models import UniqueConstraint
+
+from .querysets import CommentQuerySet, PostQuerySet
 SYMB_QUANT = 15
 User = get_user_model()
 
@@ -23,6 +25,10 @@ class Post(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -40,14 +46,43 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        blank=True,
+        # По нему thumbnails.discard проверяет, нужен ли файл кому-то ещё.
+        db_index=True
+    )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
     )
 
+    objects = PostQuerySet.as_manager()
+
     def __str__(self):
         return self.text[:SYMB_QUANT]
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_id_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+        ]
 
 
 class Comment(models.Model):
@@ -73,9 +108,15 @@ class Comment(models.Model):
         db_index=True
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Коммент'
         verbose_name_plural = 'Комменты'
+        indexes = [
+            models.Index(fields=['post', 'created', 'id'],
+                         name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.text[:SYMB_QUANT]
@@ -94,4 +135,125 @@ class Follow(models.Model):
         verbose_name='Тот на кого подписываемся')
 
     class Meta:
-        UniqueConstraint(fields=['user', 'author'], name='unique_follow')
+        constraints = [
+            UniqueConstraint(fields=['user', 'author'],
+                             name='unique_follow'),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые обновляются сигналами."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь')
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: строка на пару (читатель, пост)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор поста')
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            UniqueConstraint(fields=['user', 'post'],
+                             name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'pub_date', 'post'],
+                         name='timeline_user_pub_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='timeline_user_author_idx'),
+        ]
+
+
+class ImportCheckpoint(models.Model):
+    """Место, до которого дочитан файл импорта.
+
+    Смещение сохраняется в одной транзакции со строками, поэтому
+    продолжение после сбоя их не дублирует.
+    """
+    source = models.CharField('Источник', max_length=500, unique=True)
+    offset = models.BigIntegerField('Смещение в байтах', default=0)
+    rows = models.BigIntegerField('Прочитано строк', default=0)
+    updated_at = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Точка импорта'
+        verbose_name_plural = 'Точки импорта'
+
+
+class WriteBehindCheckpoint(models.Model):
+    """Последняя применённая строка очереди отложенной записи.
+
+    Сохраняется в одной транзакции с применёнными строками, поэтому
+    повторный сброс после сбоя их не дублирует.
+    """
+    source = models.CharField('Очередь', max_length=500, unique=True)
+    last_id = models.BigIntegerField('Последняя строка', default=0)
+    rows = models.BigIntegerField('Применено строк', default=0)
+    updated_at = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Точка отложенной записи'
+        verbose_name_plural = 'Точки отложенной записи'
+
+    def __str__(self):
+        return self.source
+
+
+class Rendition(models.Model):
+    """Готовый вариант картинки поста заданной ширины.
+
+    URL и размеры хранятся здесь, чтобы шаблону не нужно было
+    обращаться ни к хранилищу файлов, ни к хранилищу sorl.
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='renditions',
+        verbose_name='Пост')
+    name = models.CharField('Вариант', max_length=20)
+    source = models.CharField('Исходная картинка', max_length=100)
+    file = models.CharField('Файл', max_length=255)
+    url = models.CharField('URL', max_length=500)
+    webp_file = models.CharField('Файл WebP', max_length=255, blank=True)
+    webp_url = models.CharField('URL WebP', max_length=500, blank=True)
+    width = models.PositiveIntegerField('Ширина')
+    height = models.PositiveIntegerField('Высота')
+
+    class Meta:
+        verbose_name = 'Вариант картинки'
+        verbose_name_plural = 'Варианты картинок'
+        constraints = [
+            UniqueConstraint(fields=['post', 'name'],
+                             name='unique_rendition'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}:{self.name}'
@@ -0,0 +1,102 @@
+"""Кэш страниц с версиями по поколениям.
+
+Ключ закэшированной страницы содержит номера поколений её областей
+(вся лента, группа, автор). Сигналы увеличивают номер поколения при
+изменении данных, и старые записи просто перестают читаться, поэтому
+срок жизни кэша может быть долгим без риска показать устаревшее.
+"""
+import time
+from functools import wraps
+from urllib.parse import quote
+
+from django.core.cache import cache
+from django.views.decorators.cache import cache_page
+
+from core.metrics import record_cache
+
+PAGE_TIMEOUT = 60 * 60 * 6
+GENERATION_PREFIX = 'page_generation'
+ALL_POSTS = 'posts'
+ALL_GROUPS = 'groups'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def author_scope(username):
+    return f'author:{username}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def _key(scope):
+    # Слаги и имена бывают не-ASCII, а ключи memcached — только ASCII.
+    return f'{GENERATION_PREFIX}:{quote(scope)}'
+
+
+def _initial():
+    # Начинаем с текущего времени в миллисекундах, чтобы после
+    # вытеснения из кэша поколение не совпало с уже использованным.
+    return int(time.time() * 1000)
+
+
+def get_generations(scopes):
+    """Текущие поколения областей одним обращением к кэшу."""
+    keys = [_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _initial(), None)
+            found[key] = cache.get(key, _initial())
+    return [found[key] for key in keys]
+
+
+def bump(*scopes):
+    """Делает недействительными все страницы указанных областей."""
+    for scope in scopes:
+        try:
+            cache.incr(_key(scope))
+        except ValueError:
+            cache.set(_key(scope), _initial(), None)
+
+
+def cache_page_versioned(scopes, timeout=PAGE_TIMEOUT):
+    """Аналог cache_page, ключ которого зависит от поколений.
+
+    scopes получает аргументы представления и возвращает список
+    областей, от которых зависит страница. Страница содержит шапку
+    с именем пользователя и кнопки подписки, поэтому в ключе есть и
+    пользователь: cache_page сохраняет ответ до того, как
+    SessionMiddleware добавит Vary: Cookie, и сам его не учтёт.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            generations = get_generations(scopes(*args, **kwargs))
+            prefix = '{}:{}:{}'.format(
+                view.__name__, request.user.pk or 'anonymous',
+                '.'.join(map(str, generations)))
+            cached_view = cache_page(timeout, key_prefix=prefix)(view)
+            response = cached_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                # Промах cache_page помечает запрос для записи ответа.
+                miss = getattr(request, '_cache_update_cache', False)
+                record_cache('page', hits=int(not miss), misses=int(miss))
+            return response
+        return wrapper
+    return decorator
+
+
+def index_scopes():
+    return [ALL_POSTS, ALL_GROUPS]
+
+
+def group_scopes(slug):
+    return [group_scope(slug), ALL_GROUPS]
+
+
+def profile_scopes(username):
+    return [author_scope(username), ALL_GROUPS]
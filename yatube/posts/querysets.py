@@ -0,0 +1,45 @@
+"""Общие запросы для страниц с постами и комментариями.
+
+Все представления берут данные отсюда, чтобы автор и группа
+подтягивались JOIN-ом, а не отдельным запросом на каждый пост,
+и из базы читались только нужные шаблонам колонки.
+"""
+from django.db import models
+
+POST_CARD_FIELDS = (
+    'text',
+    'pub_date',
+    'updated_at',
+    'image',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group__slug',
+    'group__title',
+)
+COMMENT_FIELDS = (
+    'text',
+    'created',
+    'post_id',
+    'author__username',
+)
+
+
+class PostQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related('author', 'group')
+
+    def for_list(self):
+        """Посты для карточек в лентах."""
+        return self.with_related().only(*POST_CARD_FIELDS)
+
+    def for_detail(self):
+        """Пост для отдельной страницы вместе со счётчиками автора."""
+        return self.with_related().select_related('author__stats')
+
+
+class CommentQuerySet(models.QuerySet):
+    def for_list(self):
+        """Комментарии под постом в порядке написания."""
+        return (self.select_related('author').only(*COMMENT_FIELDS)
+                .order_by('created', 'pk'))
@@ -0,0 +1,136 @@
+"""Варианты картинок поста разной ширины для srcset.
+
+Каждый вариант кадрируется по центру в пропорциях CROP, как прежняя
+миниатюра sorl, чтобы вёрстка карточки не менялась. Варианты из
+RENDITIONS готовятся один раз после сохранения картинки
+(в том же фоне, что и миниатюры sorl) и записываются в таблицу
+Rendition вместе с URL и размерами. При отрисовке шаблон берёт их
+одним запросом на страницу и не трогает ни файлы, ни хранилище sorl.
+
+Если Pillow собран с WebP, каждый вариант сохраняется ещё и в WebP:
+тег post_image отдаёт его через <picture>, а JPEG/PNG остаётся
+для браузеров без WebP.
+"""
+import os
+import tempfile
+from collections import defaultdict
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+from .models import Post, Rendition
+
+RENDITIONS = (
+    ('small', 480),
+    ('medium', 960),
+    ('large', 1440),
+)
+# Пропорции карточки: как у {% thumbnail "960x339" crop="center" %}.
+CROP = (960, 339)
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+DIRECTORY = 'posts/renditions'
+
+
+def _save(image, name):
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA')
+    image_format, extension = ('PNG', 'png') if has_alpha else ('JPEG', 'jpg')
+    with tempfile.TemporaryFile() as output:
+        if has_alpha:
+            image.save(output, image_format, optimize=True)
+        else:
+            image.convert('RGB').save(output, image_format,
+                                      quality=JPEG_QUALITY, optimize=True,
+                                      progressive=True)
+        output.seek(0)
+        return default_storage.save(f'{name}.{extension}', File(output))
+
+
+def _save_webp(image, name):
+    if not features.check('webp'):
+        return ''
+    with tempfile.TemporaryFile() as output:
+        image.save(output, 'WEBP', quality=WEBP_QUALITY, method=4)
+        output.seek(0)
+        return default_storage.save(f'{name}.webp', File(output))
+
+
+def stored_files(renditions):
+    """Имена всех файлов вариантов: основных и WebP."""
+    return [name for rendition in renditions
+            for name in (rendition.file, rendition.webp_file) if name]
+
+
+def _delete_files(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+def build(post_id):
+    """Готовит варианты картинки поста и заменяет ими старые."""
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None:
+        return []
+    old = list(Rendition.objects.filter(post_id=post_id))
+    if not post.image:
+        Rendition.objects.filter(post_id=post_id).delete()
+        _delete_files(stored_files(old))
+        return []
+    source = post.image.name
+    stem = os.path.splitext(os.path.basename(source))[0]
+    created = []
+    with post.image.open('rb') as stored, Image.open(stored) as image:
+        image.draft('RGB', (RENDITIONS[-1][1], RENDITIONS[-1][1]))
+        image = ImageOps.exif_transpose(image)
+        original_width = image.width
+        for name, width in RENDITIONS:
+            # Шире оригинала не растягиваем: хватит одного варианта
+            # в размер оригинала.
+            width = min(width, original_width)
+            if created and created[-1].width >= width:
+                break
+            height = max(1, int(width * CROP[1] / CROP[0] + 0.5))
+            variant = ImageOps.fit(image, (width, height), Image.LANCZOS)
+            base = f'{DIRECTORY}/{post_id}/{stem}-{name}'
+            file = _save(variant, base)
+            webp_file = _save_webp(variant, base)
+            created.append(Rendition(
+                post_id=post_id, name=name, source=source, file=file,
+                url=default_storage.url(file), webp_file=webp_file,
+                webp_url=webp_file and default_storage.url(webp_file),
+                width=variant.width, height=variant.height))
+    Rendition.objects.filter(post_id=post_id).delete()
+    Rendition.objects.bulk_create(created)
+    kept = set(stored_files(created))
+    _delete_files(name for name in stored_files(old) if name not in kept)
+    # Карточки и страницы с постом должны перерисоваться с srcset:
+    # сохранение сдвигает updated_at и поколения page_cache.
+    Post.objects.get(pk=post_id).save(update_fields=['updated_at'])
+    return created
+
+
+def attach(posts):
+    """Подгружает варианты картинок постов одним запросом.
+
+    Варианты от прежней картинки (если новая ещё готовится)
+    отбрасываются.
+    """
+    pending = [post for post in posts
+               if post.image and not hasattr(post, 'rendition_list')]
+    for post in posts:
+        if not post.image:
+            post.rendition_list = []
+    if not pending:
+        return
+    found = defaultdict(list)
+    # Сортируем в Python: ORDER BY width дал бы временное B-дерево
+    # на каждой странице списка, а вариантов у поста всего несколько.
+    for rendition in Rendition.objects.filter(
+            post_id__in=[post.pk for post in pending]):
+        found[rendition.post_id].append(rendition)
+    for post in pending:
+        post.rendition_list = sorted(
+            (rendition for rendition in found[post.pk]
+             if rendition.source == post.image.name),
+            key=lambda rendition: rendition.width)
@@ -0,0 +1,166 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Индекс — внешняя FTS5-таблица поверх posts_post, синхронизация идёт
+триггерами базы, поэтому её не обходят ни bulk_create, ни update().
+На других СУБД поиск откатывается на icontains.
+"""
+import re
+
+from django.db import connection
+
+from .models import Post
+from .utils import KeysetPaginator, decode_cursor, encode_cursor
+
+FTS_TABLE = 'posts_post_fts'
+SEARCH_PER_PAGE = 10
+
+INSTALL_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "text, content='posts_post', content_rowid='id',"
+    " tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai"
+    " AFTER INSERT ON posts_post"
+    f" BEGIN INSERT INTO {FTS_TABLE}(rowid, text)"
+    " VALUES (new.id, new.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad"
+    " AFTER DELETE ON posts_post"
+    f" BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)"
+    " VALUES ('delete', old.id, old.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au"
+    " AFTER UPDATE OF text ON posts_post"
+    f" BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)"
+    " VALUES ('delete', old.id, old.text);"
+    f" INSERT INTO {FTS_TABLE}(rowid, text)"
+    " VALUES (new.id, new.text); END",
+)
+REBUILD_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+UNINSTALL_SQL = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_available(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def install(using=connection):
+    """Создаёт индекс и триггеры, если их ещё нет.
+
+    Вызывается и после каждой миграции: пересоздание таблицы
+    posts_post в SQLite удаляет её триггеры.
+    """
+    if not is_available(using):
+        return
+    with using.cursor() as cursor:
+        for statement in INSTALL_SQL:
+            cursor.execute(statement)
+
+
+def rebuild(using=connection):
+    """Перестраивает индекс по текущему содержимому posts_post."""
+    if not is_available(using):
+        return
+    with using.cursor() as cursor:
+        cursor.execute(REBUILD_SQL)
+
+
+def drop_triggers(using=connection):
+    """Отключает синхронизацию на время массовой загрузки.
+
+    После загрузки вызовите install() и rebuild().
+    """
+    if not is_available(using):
+        return
+    with using.cursor() as cursor:
+        for statement in UNINSTALL_SQL[:-1]:
+            cursor.execute(statement)
+
+
+def uninstall(using=connection):
+    if not is_available(using):
+        return
+    with using.cursor() as cursor:
+        for statement in UNINSTALL_SQL:
+            cursor.execute(statement)
+
+
+def to_match(query):
+    """Превращает пользовательский ввод в безопасный запрос FTS5.
+
+    Каждое слово берётся в кавычки, поэтому операторы FTS5 во вводе
+    не работают; слова объединяются через AND.
+    """
+    return ' '.join(f'"{token}"' for token in TOKEN_RE.findall(query))
+
+
+def filter_posts(queryset, query):
+    """Оставляет в queryset посты, подходящие под запрос."""
+    match = to_match(query)
+    if not match:
+        return queryset.none()
+    if not is_available():
+        return queryset.filter(text__icontains=query)
+    # RawSQL в pk__in Django 2.2 берёт в двойные скобки, и SQLite
+    # считает подзапрос скалярным — вернулась бы только первая строка.
+    return queryset.extra(
+        where=[f'posts_post.id IN (SELECT rowid FROM {FTS_TABLE}'
+               f' WHERE {FTS_TABLE} MATCH %s)'],
+        params=[match])
+
+
+def search(query, group=None, author=None, after=None,
+           per_page=SEARCH_PER_PAGE):
+    """Страница результатов по релевантности и токен следующей.
+
+    Пагинация курсорная по (score, id), без OFFSET.
+    """
+    match = to_match(query)
+    if not match:
+        return [], None
+    if not is_available():
+        return _search_icontains(query, group, author, after, per_page)
+    sql = [
+        f'SELECT p.id, bm25({FTS_TABLE}) AS score FROM {FTS_TABLE}'
+        f' JOIN posts_post p ON p.id = {FTS_TABLE}.rowid'
+        f' WHERE {FTS_TABLE} MATCH %s'
+    ]
+    params = [match]
+    if group is not None:
+        sql.append('AND p.group_id = %s')
+        params.append(group.pk)
+    if author is not None:
+        sql.append('AND p.author_id = %s')
+        params.append(author.pk)
+    cursor_values = decode_cursor(after) if after else None
+    if cursor_values and len(cursor_values) == 2:
+        sql.append('AND (score > %s OR (score = %s AND p.id > %s))')
+        score, last_id = cursor_values
+        params.extend([score, score, last_id])
+    sql.append('ORDER BY score, p.id LIMIT %s')
+    params.append(per_page + 1)
+    with connection.cursor() as cursor:
+        cursor.execute(' '.join(sql), params)
+        rows = cursor.fetchall()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    posts = Post.objects.for_list().in_bulk([pk for pk, _ in rows])
+    results = [posts[pk] for pk, _ in rows if pk in posts]
+    next_cursor = None
+    if has_next:
+        last_id, score = rows[-1]
+        next_cursor = encode_cursor([score, last_id])
+    return results, next_cursor
+
+
+def _search_icontains(query, group, author, after, per_page):
+    posts = Post.objects.for_list().filter(text__icontains=query)
+    if group is not None:
+        posts = posts.filter(group=group)
+    if author is not None:
+        posts = posts.filter(author=author)
+    page = KeysetPaginator(posts, per_page).get_page(after=after)
+    return list(page), page.next_cursor
@@ -0,0 +1,143 @@
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import (counters, page_cache, renditions, search, thumbnail_cache,
+               thumbnails, timeline)
+from .models import Comment, Follow, Group, Post, Rendition
+
+User = get_user_model()
+
+
+def _group_scopes(*group_ids):
+    slugs = Group.objects.filter(
+        pk__in=[pk for pk in group_ids if pk is not None]
+    ).values_list('slug', flat=True)
+    return [page_cache.group_scope(slug) for slug in slugs]
+
+
+def _author_scopes(*user_ids):
+    usernames = User.objects.filter(pk__in=user_ids).values_list(
+        'username', flat=True)
+    return [page_cache.author_scope(username) for username in usernames]
+
+
+def _bump_post(post, *group_ids):
+    page_cache.bump(
+        page_cache.ALL_POSTS,
+        page_cache.post_scope(post.pk),
+        *_author_scopes(post.author_id),
+        *_group_scopes(post.group_id, *group_ids),
+    )
+
+
+def _discard_image(post, image_name):
+    """Удаляет файлы прежней картинки поста и её вариантов.
+
+    Строки вариантов остаются: их заменит renditions.build, а до тех
+    пор attach их не выводит, потому что у них другой source.
+    """
+    thumbnails.discard(image_name, renditions.stored_files(
+        Rendition.objects.filter(post=post, source=image_name)))
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, raw=False, **kwargs):
+    if instance.pk is None or raw:
+        return
+    instance._previous_group_id, instance._previous_image = (
+        Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'image').first() or (None, None))
+
+
+@receiver(pre_save, sender=Group)
+def remember_slug(sender, instance, raw=False, **kwargs):
+    if instance.pk is None or raw:
+        return
+    instance._previous_slug = Group.objects.filter(
+        pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user(instance.author_id, posts_count=1)
+        timeline.fan_out(instance)
+    previous_image = getattr(instance, '_previous_image', None)
+    if previous_image != instance.image.name:
+        thumbnail_cache.forget(previous_image)
+        if previous_image:
+            _discard_image(instance, previous_image)
+    _bump_post(instance, getattr(instance, '_previous_group_id', None))
+
+
+@receiver(pre_delete, sender=Post)
+def remember_renditions(sender, instance, **kwargs):
+    # После удаления поста строк вариантов уже не будет.
+    instance._rendition_files = renditions.stored_files(
+        instance.renditions.all())
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, posts_count=-1)
+    thumbnail_cache.forget(instance.image.name)
+    thumbnails.discard(instance.image.name,
+                       getattr(instance, '_rendition_files', ()))
+    _bump_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_comments(instance.post_id, 1)
+    page_cache.bump(page_cache.post_scope(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_comments(instance.post_id, -1)
+    page_cache.bump(page_cache.post_scope(instance.post_id))
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_slug', None)
+    page_cache.bump(page_cache.group_scope(instance.slug))
+    if previous is not None and previous != instance.slug:
+        # Ссылки на группу есть во всех лентах.
+        page_cache.bump(page_cache.group_scope(previous),
+                        page_cache.ALL_GROUPS)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    page_cache.bump(page_cache.group_scope(instance.slug),
+                    page_cache.ALL_GROUPS)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user(instance.user_id, following_count=1)
+        counters.change_user(instance.author_id, followers_count=1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        page_cache.bump(*_author_scopes(instance.user_id,
+                                        instance.author_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_user(instance.user_id, following_count=-1)
+    counters.change_user(instance.author_id, followers_count=-1)
+    timeline.prune(instance.user_id, instance.author_id)
+    page_cache.bump(*_author_scopes(instance.user_id, instance.author_id))
+
+
+def ensure_search_index(sender, using, **kwargs):
+    # Пересоздание posts_post в миграциях SQLite удаляет триггеры.
+    connection = connections[using]
+    if search.FTS_TABLE in connection.introspection.table_names():
+        search.install(connection)
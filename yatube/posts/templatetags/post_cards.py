@@ -0,0 +1,51 @@
+import hashlib
+
+from django import template
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.metrics import record_cache
+from posts import renditions
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+CARD_TIMEOUT = 60 * 60 * 24
+
+register = template.Library()
+
+
+def card_key(post):
+    """Ключ карточки: id поста и версия всего, что в ней выводится."""
+    version = '|'.join([
+        post.updated_at.isoformat() if post.updated_at else '',
+        post.author.username,
+        post.author.get_full_name(),
+        post.group.slug if post.group_id else '',
+    ])
+    digest = hashlib.md5(version.encode()).hexdigest()[:16]
+    return f'post_card:{post.pk}:{digest}'
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Готовые карточки постов страницы.
+
+    Закэшированные карточки достаются одним get_many, отрисовываются
+    только недостающие.
+    """
+    posts = list(posts)
+    keys = [card_key(post) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {}
+    # Варианты картинок нужны только отрисовываемым карточкам; их
+    # готовность сдвигает updated_at, а значит и ключ карточки.
+    renditions.attach([post for key, post in zip(keys, posts)
+                       if key not in cards])
+    for key, post in zip(keys, posts):
+        if key not in cards:
+            missing[key] = render_to_string(CARD_TEMPLATE, {'post': post})
+    record_cache('fragment', hits=len(cards), misses=len(missing))
+    if missing:
+        cache.set_many(missing, CARD_TIMEOUT)
+        cards.update(missing)
+    return [mark_safe(cards[key]) for key in keys]
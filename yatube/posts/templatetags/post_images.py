@@ -0,0 +1,40 @@
+from django import template
+from django.utils.html import format_html
+
+from posts import renditions
+
+# Карточка занимает всю ширину на телефоне и не шире 960px дальше.
+DEFAULT_SIZES = '(max-width: 576px) 100vw, 960px'
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_image(post, css_class='', sizes=DEFAULT_SIZES):
+    """<img> со srcset из готовых вариантов картинки поста.
+
+    Всё берётся из таблицы вариантов: файлы и хранилище sorl не
+    трогаются. Если у вариантов есть WebP, <img> оборачивается
+    в <picture> с источником image/webp. Если варианты ещё не готовы,
+    возвращает пустую строку.
+    """
+    if not post.image:
+        return ''
+    renditions.attach([post])
+    if not post.rendition_list:
+        return ''
+    largest = post.rendition_list[-1]
+    srcset = ', '.join(f'{rendition.url} {rendition.width}w'
+                       for rendition in post.rendition_list)
+    image = format_html(
+        '<img class="{}" src="{}" srcset="{}" sizes="{}" width="{}" '
+        'height="{}" loading="lazy" decoding="async" alt="">',
+        css_class, largest.url, srcset, sizes, largest.width,
+        largest.height)
+    if not all(rendition.webp_url for rendition in post.rendition_list):
+        return image
+    webp_srcset = ', '.join(f'{rendition.webp_url} {rendition.width}w'
+                            for rendition in post.rendition_list)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">{}'
+        '</picture>', webp_srcset, sizes, image)
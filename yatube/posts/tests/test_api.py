@@ -0,0 +1,140 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import api
+from posts.models import Comment, Group, Post
+from posts.utils import POST_PER_PAGE
+
+NUMBER_OF_POSTS: int = 13
+NUMBER_OF_COMMENTS: int = 3
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='writer',
+                                         first_name='Лев',
+                                         last_name='Толстой')
+        cls.group = Group.objects.create(title='Группа', slug='api',
+                                         description='описание')
+        for i in range(NUMBER_OF_POSTS):
+            cls.post = Post.objects.create(text=f'пост {i}',
+                                           author=cls.author,
+                                           group=cls.group)
+        for i in range(NUMBER_OF_COMMENTS):
+            Comment.objects.create(post=cls.post, author=cls.author,
+                                   text=f'комментарий {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_feeds_walk_by_cursor(self):
+        """Ленты листаются курсором next без повторов и пропусков."""
+        urls = (
+            reverse('posts:api_index'),
+            reverse('posts:api_group', args=(self.group.slug,)),
+            reverse('posts:api_profile', args=(self.author.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                seen = []
+                while url:
+                    data = self.client.get(url).json()
+                    self.assertLessEqual(len(data['results']),
+                                         POST_PER_PAGE)
+                    seen += [post['id'] for post in data['results']]
+                    url = data['next']
+                self.assertEqual(seen, list(Post.objects.order_by(
+                    '-pub_date', '-pk').values_list('pk', flat=True)))
+
+    def test_feed_headers(self):
+        """Группа и автор отдаются вместе с лентой."""
+        data = self.client.get(
+            reverse('posts:api_profile', args=(self.author.username,))
+        ).json()
+        self.assertEqual(data['author']['full_name'], 'Лев Толстой')
+        self.assertEqual(data['author']['posts_count'], NUMBER_OF_POSTS)
+        self.assertIsNone(data['previous'])
+        data = self.client.get(
+            reverse('posts:api_group', args=(self.group.slug,))).json()
+        self.assertEqual(data['group']['title'], 'Группа')
+        self.assertEqual(data['results'][0]['group']['slug'], 'api')
+
+    def test_post_detail_with_comments(self):
+        """Пост отдаётся с комментариями в порядке написания."""
+        data = self.client.get(
+            reverse('posts:api_post_detail', args=(self.post.pk,))).json()
+        self.assertEqual(data['text'], self.post.text)
+        self.assertEqual(data['comments_count'], NUMBER_OF_COMMENTS)
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']['results']],
+            [f'комментарий {i}' for i in range(NUMBER_OF_COMMENTS)])
+        self.assertIsNone(data['comments']['next'])
+
+    def test_comments_cursor(self):
+        """Комментарии тоже листаются курсором."""
+        url = reverse('posts:api_post_detail', args=(self.post.pk,))
+        texts = []
+        per_page = api.COMMENTS_PER_PAGE
+        api.COMMENTS_PER_PAGE = 2
+        try:
+            while url:
+                data = self.client.get(url).json()['comments']
+                texts += [comment['text'] for comment in data['results']]
+                url = data['next']
+        finally:
+            api.COMMENTS_PER_PAGE = per_page
+        self.assertEqual(
+            texts, [f'комментарий {i}' for i in range(NUMBER_OF_COMMENTS)])
+
+    def test_fixed_number_of_queries(self):
+        """Число запросов не зависит от размера страницы."""
+        urls = {
+            reverse('posts:api_index'): 1,
+            reverse('posts:api_group', args=(self.group.slug,)): 2,
+            reverse('posts:api_profile', args=(self.author.username,)): 2,
+            reverse('posts:api_post_detail', args=(self.post.pk,)): 2,
+        }
+        for url, expected in urls.items():
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(url)
+                self.assertEqual(len(queries), expected)
+
+    def test_not_modified(self):
+        """Совпавший If-None-Match получает 304 без запросов к базе."""
+        url = reverse('posts:api_post_detail', args=(self.post.pk,))
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(len(queries), 0)
+
+    def test_etag_changes_with_data(self):
+        """Новый комментарий или пост меняют ETag."""
+        detail = reverse('posts:api_post_detail', args=(self.post.pk,))
+        index = reverse('posts:api_index')
+        etags = {url: self.client.get(url)['ETag'] for url in (detail, index)}
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='новый')
+        response = self.client.get(detail, HTTP_IF_NONE_MATCH=etags[detail])
+        self.assertEqual(response.status_code, 200)
+        Post.objects.create(text='новый пост', author=self.author)
+        response = self.client.get(index, HTTP_IF_NONE_MATCH=etags[index])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['text'], 'новый пост')
+
+    def test_read_only(self):
+        response = self.client.post(reverse('posts:api_index'))
+        self.assertEqual(response.status_code, 405)
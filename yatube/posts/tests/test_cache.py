@@ -2,7 +2,8 @@ from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
-from posts.models import Post, User
+from posts import page_cache
+from posts.models import Follow, Group, Post, User
 
 
 class PostCacheTests(TestCase):
@@ -11,18 +12,23 @@ class PostCacheTests(TestCase):
         super().setUpClass()
         cls.guest_client = Client()
         cls.user = User.objects.create_user(username='HasNoName')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(title='Группа', slug='cached',
+                                         description='кэш')
         cls.authorized_client = Client()
 
         cls.authorized_client.force_login(cls.user)
 
+    def setUp(self):
+        cache.clear()
+
     def test_cache_index(self):
+        """Страница берётся из кэша, пока данные не менялись."""
+        post = Post.objects.create(text='abrakadabra', author=self.user)
         response = self.authorized_client.get(reverse('posts:index'))
         posts = response.content
 
-        Post.objects.create(
-            text='abrakadabra',
-            author=self.user,
-        )
+        Post.objects.filter(pk=post.pk).update(text='без сигналов')
         response_cached = self.authorized_client.get(reverse('posts:index'))
 
         previous_posts = response_cached.content
@@ -33,3 +39,79 @@ class PostCacheTests(TestCase):
         )
         new_posts = response_new_cached.content
         self.assertNotEqual(previous_posts, new_posts)
+
+    def test_new_post_invalidates_index(self):
+        """Новый пост сразу виден на главной."""
+        self.authorized_client.get(reverse('posts:index'))
+        Post.objects.create(text='свежий пост', author=self.user)
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'свежий пост')
+
+    def test_only_affected_scopes_are_bumped(self):
+        """Пост автора не сбрасывает кэш чужого профиля и группы."""
+        group_url = reverse('posts:group_list', args=[self.group.slug])
+        other_url = reverse('posts:profile', args=[self.other.username])
+        own_url = reverse('posts:profile', args=[self.user.username])
+        for url in (group_url, other_url, own_url):
+            self.guest_client.get(url)
+        Post.objects.create(text='новый пост', author=self.user)
+        self.assertFalse(self.guest_client.get(group_url).context)
+        self.assertFalse(self.guest_client.get(other_url).context)
+        self.assertContains(self.guest_client.get(own_url), 'новый пост')
+
+    def test_cached_page_is_per_user(self):
+        """Закэшированная страница не достаётся другому пользователю."""
+        Follow.objects.create(user=self.user, author=self.other)
+        reader = Client()
+        reader.force_login(User.objects.create_user(username='Reader'))
+        urls = (reverse('posts:index'),
+                reverse('posts:group_list', args=[self.group.slug]),
+                reverse('posts:profile', args=[self.other.username]))
+        for url in urls:
+            self.authorized_client.get(url)
+            guest = self.guest_client.get(url)
+            self.assertNotContains(guest, 'Пользователь: HasNoName')
+            self.assertNotContains(guest, 'Выйти')
+            self.assertContains(reader.get(url), 'Пользователь: Reader')
+        profile_url = reverse('posts:profile', args=[self.other.username])
+        unfollow_url = reverse('posts:profile_unfollow',
+                               args=[self.other.username])
+        self.assertContains(self.authorized_client.get(profile_url),
+                            unfollow_url)
+        self.assertNotContains(reader.get(profile_url), unfollow_url)
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='CardAuthor')
+        cls.first = Post.objects.create(text='первый', author=cls.user)
+        cls.second = Post.objects.create(text='второй', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def render_index(self):
+        # Сбрасываем кэш страницы, но не кэш карточек.
+        page_cache.bump(page_cache.ALL_POSTS)
+        return self.client.get(reverse('posts:index'))
+
+    def test_cards_are_reused(self):
+        """Неизменённые карточки берутся из кэша."""
+        self.render_index()
+        Post.objects.filter(pk=self.first.pk).update(text='без версии')
+        self.assertContains(self.render_index(), 'первый')
+
+    def test_edit_invalidates_only_its_card(self):
+        """Правка поста перерисовывает только его карточку."""
+        self.render_index()
+        Post.objects.filter(pk=self.second.pk).update(text='без версии')
+        self.client.post(
+            reverse('posts:post_edit', args=[self.first.pk]),
+            {'text': 'отредактирован'})
+        response = self.render_index()
+        self.assertContains(response, 'отредактирован')
+        self.assertContains(response, 'второй')
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts.utils import COMMENTS_PER_PAGE
+
+NUMBER_OF_COMMENTS: int = COMMENTS_PER_PAGE * 2 + 7
+
+User = get_user_model()
+
+
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='commenter')
+        cls.post = Post.objects.create(text='вирусный пост',
+                                       author=cls.author)
+        Comment.objects.bulk_create([
+            Comment(post=cls.post, author=cls.author, text=f'мнение {i}')
+            for i in range(NUMBER_OF_COMMENTS)
+        ])
+        cls.ordered = list(Comment.objects.order_by(
+            'created', 'pk').values_list('text', flat=True))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_detail_renders_first_page(self):
+        """На странице поста только первая страница комментариев."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,)))
+        comments = response.context['comments']
+        self.assertEqual([comment.text for comment in comments],
+                         self.ordered[:COMMENTS_PER_PAGE])
+        self.assertContains(response, 'data-comments-more')
+
+    def test_load_more_html(self):
+        """Фрагменты HTML по курсору покрывают все комментарии."""
+        texts = []
+        after = ''
+        while True:
+            response = self.client.get(
+                reverse('posts:post_comments', args=(self.post.pk,)),
+                {'after': after} if after else {})
+            texts += [comment.text for comment in response.context['comments']]
+            after = response.context['comments_page'].next_cursor
+            if not after:
+                break
+        self.assertEqual(texts, self.ordered)
+        self.assertNotContains(response, 'data-comments-more')
+
+    def test_load_more_json(self):
+        """JSON отдаёт комментарии и ссылку на следующую страницу."""
+        url = reverse('posts:post_comments', args=(self.post.pk,))
+        url += '?format=json'
+        texts = []
+        while url:
+            data = self.client.get(url).json()
+            texts += [comment['text'] for comment in data['results']]
+            url = data['next']
+        self.assertEqual(texts, self.ordered)
+
+    def test_queries_do_not_depend_on_comments(self):
+        """Авторы комментариев приходят тем же запросом."""
+        url = reverse('posts:post_comments', args=(self.post.pk,))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertLessEqual(len(queries), 3)
+
+    def test_missing_post(self):
+        response = self.client.get(
+            reverse('posts:post_comments', args=(self.post.pk + 1,)))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,88 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='cond',
+                                         description='условные запросы')
+        cls.post = Post.objects.create(text='пост', author=cls.author,
+                                       group=cls.group)
+        cls.urls = (
+            reverse('posts:post_detail', args=(cls.post.pk,)),
+            reverse('posts:group_list', args=(cls.group.slug,)),
+            reverse('posts:profile', args=(cls.author.username,)),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_validators_are_sent(self):
+        """Страницы отдают ETag, но не Last-Modified."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.has_header('ETag'))
+                self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_not_modified_in_one_query(self):
+        """Повторный запрос получает 304 за один запрос к базе."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(len(queries), 1)
+
+    def test_if_modified_since_alone_is_not_trusted(self):
+        """Новый подписчик виден и при одном If-Modified-Since."""
+        url = self.urls[2]
+        self.client.get(url)
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['followers_count'], 1)
+
+    def test_comment_changes_post_validator(self):
+        """Новый комментарий делает страницу поста изменённой."""
+        url = self.urls[0]
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='комментарий')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'комментарий')
+
+    def test_edit_changes_group_validator(self):
+        """Правка старого поста меняет ETag ленты группы."""
+        url = self.urls[1]
+        etag = self.client.get(url)['ETag']
+        self.post.text = 'исправленный пост'
+        self.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        """Гость и автор получают разные ETag одной страницы."""
+        url = self.urls[2]
+        etag = self.client.get(url)['ETag']
+        self.client.force_login(self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_post(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk + 100,)))
+        self.assertEqual(response.status_code, 404)
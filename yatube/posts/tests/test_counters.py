@@ -0,0 +1,60 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='counted')
+        cls.reader = User.objects.create(username='counter')
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_signals_keep_counters(self):
+        """Создание и удаление объектов меняет счётчики."""
+        post = Post.objects.create(text='пост', author=self.author)
+        Post.objects.create(text='ещё пост', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='к')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        follow.delete()
+        post.delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 0)
+
+    def test_rebuild_command(self):
+        """Команда восстанавливает счётчики по таблицам."""
+        Post.objects.bulk_create([
+            Post(text=f'пост {i}', author=self.author) for i in range(3)
+        ])
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 3)
+
+    def test_views_read_counters(self):
+        """Профиль и пост берут число постов из счётчика."""
+        post = Post.objects.create(text='пост', author=self.author)
+        UserStats.objects.filter(user=self.author).update(posts_count=7)
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username]))
+        self.assertEqual(response.context['post_total'], 7)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertEqual(response.context['count_posts'], 7)
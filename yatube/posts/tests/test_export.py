@@ -0,0 +1,92 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import exporter
+from posts.models import Group, Post
+
+NUMBER_OF_POSTS: int = 7
+
+User = get_user_model()
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='exporter')
+        cls.other = User.objects.create(username='someone')
+        cls.group = Group.objects.create(title='Группа', slug='export',
+                                         description='выгрузка')
+        for i in range(NUMBER_OF_POSTS):
+            Post.objects.create(text=f'пост "{i}", с запятой',
+                                author=cls.author, group=cls.group)
+        Post.objects.create(text='чужой', author=cls.other)
+
+    def setUp(self):
+        self.client = Client()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_profile_export_streams_jsonl(self):
+        """Выгрузка профиля отдаётся потоком построчно."""
+        response = self.client.get(
+            reverse('posts:profile_export', args=[self.author.username]))
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        items = [json.loads(line) for line in
+                 b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(items), NUMBER_OF_POSTS)
+        self.assertEqual({item['author'] for item in items},
+                         {self.author.username})
+        self.assertEqual([item['id'] for item in items],
+                         sorted(item['id'] for item in items))
+
+    def test_group_export_csv(self):
+        response = self.client.get(
+            reverse('posts:group_export', args=[self.group.slug]),
+            {'format': 'csv'})
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(len(rows), NUMBER_OF_POSTS)
+        self.assertEqual(rows[0]['text'], 'пост "0", с запятой')
+        self.assertEqual(rows[0]['group'], self.group.slug)
+
+    def test_unknown_format(self):
+        response = self.client.get(
+            reverse('posts:group_export', args=[self.group.slug]),
+            {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_rows_do_not_depend_on_size(self):
+        """Одна выборка на порцию, без запросов на каждый пост."""
+        with CaptureQueriesContext(connection) as context:
+            items = list(exporter.rows(exporter.author_posts(self.author)))
+        self.assertEqual(len(items), NUMBER_OF_POSTS)
+        self.assertEqual(len(context), 1)
+
+    def test_command_writes_gzip_that_imports_back(self):
+        """Команда пишет сжатый файл в формате import_content."""
+        path = os.path.join(self.directory, 'posts.jsonl.gz')
+        call_command('export_posts', path, author=self.author.username,
+                     stdout=StringIO())
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            items = [json.loads(line) for line in file]
+        self.assertEqual(len(items), NUMBER_OF_POSTS)
+        Post.objects.filter(author=self.author).delete()
+        call_command('import_content', 'posts', path, stdout=StringIO())
+        self.assertEqual(Post.objects.filter(author=self.author).count(),
+                         NUMBER_OF_POSTS)
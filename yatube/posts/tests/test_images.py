@@ -0,0 +1,150 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image
+
+from posts import images, renditions
+from posts.forms import PostForm
+from posts.models import Post, Rendition, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def encode(image, image_format, **options):
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class UploadPipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='photographer')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def upload(self, name, content):
+        form = PostForm(data={'text': 'с картинкой'}, files={
+            'image': SimpleUploadedFile(name, content)})
+        if not form.is_valid():
+            return form
+        post = form.save(commit=False)
+        post.author = self.author
+        post.save()
+        return post
+
+    def test_small_clean_image_is_kept(self):
+        """Маленькая картинка без метаданных сохраняется как есть."""
+        post = self.upload('small.gif', SMALL_GIF)
+        self.assertEqual(post.image.name, 'posts/small.gif')
+        with post.image.open('rb') as stored:
+            self.assertEqual(stored.read(), SMALL_GIF)
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+
+    def test_large_photo_is_downscaled_and_stripped(self):
+        """Большое фото уменьшается и теряет EXIF."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Phone'
+        photo = encode(Image.new('RGB', (4000, 1000), 'red'), 'JPEG',
+                       exif=exif.tobytes())
+        post = Post.objects.get(pk=self.upload('photo.jpg', photo).pk)
+        self.assertEqual((post.image_width, post.image_height),
+                         (images.MAX_SIDE, images.MAX_SIDE // 4))
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.format, 'JPEG')
+            self.assertEqual(stored.size, (images.MAX_SIDE,
+                                           images.MAX_SIDE // 4))
+            self.assertNotIn('exif', stored.info)
+
+    def test_transparency_is_kept_in_png(self):
+        image = Image.new('RGBA', (3000, 100), (0, 0, 0, 0))
+        post = self.upload('logo.png', encode(image, 'PNG'))
+        self.assertTrue(post.image.name.endswith('.png'))
+        self.assertEqual(post.image_width, images.MAX_SIDE)
+
+    def test_decompression_bomb_is_rejected(self):
+        """Огромная по пикселям картинка отклоняется по заголовку."""
+        bomb = encode(Image.new('1', (8000, 6000)), 'PNG')
+        form = self.upload('bomb.png', bomb)
+        self.assertIn('image', form.errors)
+        self.assertFalse(Post.objects.exists())
+
+    def test_not_an_image(self):
+        form = self.upload('text.gif', b'not an image at all')
+        self.assertIn('image', form.errors)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageCleanupTest(TransactionTestCase):
+    """Файлы прежних картинок удаляются после коммита."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='photographer')
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create(self, name='photo.jpg'):
+        post = Post.objects.create(
+            text='с картинкой', author=self.author,
+            image=SimpleUploadedFile(
+                name, encode(Image.new('RGB', (600, 300)), 'JPEG')))
+        renditions.build(post.pk)
+        return post
+
+    def files(self, post):
+        return [post.image.name] + renditions.stored_files(
+            Rendition.objects.filter(post=post))
+
+    def assertDeleted(self, names):
+        for name in names:
+            self.assertFalse(default_storage.exists(name), name)
+
+    def test_replaced_image_is_deleted(self):
+        post = self.create()
+        old = self.files(post)
+        post.image = SimpleUploadedFile('new.gif', SMALL_GIF)
+        post.save()
+        self.assertDeleted(old)
+        self.assertTrue(default_storage.exists(post.image.name))
+
+    def test_deleted_post_takes_its_files(self):
+        post = self.create()
+        old = self.files(post)
+        # Картинка и хотя бы два варианта.
+        self.assertGreaterEqual(len(old), 3)
+        post.delete()
+        self.assertDeleted(old)
+
+    def test_shared_file_is_kept(self):
+        """Файл, на который ссылается другой пост, остаётся."""
+        post = self.create()
+        Post.objects.create(text='тот же файл', author=self.author,
+                            image=post.image.name)
+        post.delete()
+        self.assertTrue(default_storage.exists(post.image.name))
+
+    def test_shared_file_lookup_uses_index(self):
+        """Проверка общего файла не обходит всю таблицу постов."""
+        plan = Post.objects.filter(image='posts/photo.jpg').explain()
+        self.assertIn('INDEX', plan)
+        self.assertNotIn('SCAN', plan)
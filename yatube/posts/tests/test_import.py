@@ -0,0 +1,145 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import search
+from posts.importer import Importer, read_rows
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+NUMBER_OF_POSTS: int = 25
+CHUNK: int = 10
+
+User = get_user_model()
+
+
+class Interrupted(Exception):
+    pass
+
+
+class ImportContentTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='legacy_author')
+        cls.reader = User.objects.create(username='legacy_reader')
+        cls.group = Group.objects.create(title='Группа', slug='legacy',
+                                         description='импорт')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def posts_file(self):
+        return self.write('posts.jsonl.gz', ''.join(
+            json.dumps({'id': 1000 + i, 'author': 'legacy_author',
+                        'text': f'старый пост {i}', 'group': 'legacy',
+                        'pub_date': f'2019-05-01T10:{i:02d}:00'}) + '\n'
+            for i in range(NUMBER_OF_POSTS)
+        ) + 'битая строка\n'
+            + json.dumps({'author': 'ghost', 'text': 'x'}) + '\n')
+
+    def test_import_posts_and_rebuild(self):
+        """Посты загружаются с датами, счётчиками и поиском."""
+        out = StringIO()
+        call_command('import_content', 'posts', self.posts_file(),
+                     chunk=CHUNK, stdout=out)
+        self.assertEqual(Post.objects.count(), NUMBER_OF_POSTS)
+        post = Post.objects.get(pk=1000)
+        self.assertEqual(post.pub_date.year, 2019)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(self.author.stats.posts_count, NUMBER_OF_POSTS)
+        self.assertEqual(len(search.search('старый', per_page=100)[0]),
+                         NUMBER_OF_POSTS)
+        self.assertIn('неизвестный пользователь', out.getvalue())
+        self.assertIn('строк/с', out.getvalue())
+
+    def test_resume_after_failure(self):
+        """После сбоя импорт продолжается без дублей."""
+        path = self.posts_file()
+        importer = Importer('posts', chunk_size=CHUNK)
+
+        def fail(rows, imported):
+            raise Interrupted
+
+        with self.assertRaises(Interrupted):
+            importer.run(path, progress=fail)
+        self.assertEqual(Post.objects.count(), CHUNK)
+        Importer('posts', chunk_size=CHUNK).run(path)
+        self.assertEqual(Post.objects.count(), NUMBER_OF_POSTS)
+        Importer('posts', chunk_size=CHUNK).run(path)
+        self.assertEqual(Post.objects.count(), NUMBER_OF_POSTS)
+
+    def test_csv_comments_and_follows(self):
+        """CSV с переносами в полях; ссылки на чужие посты пропускаются."""
+        post = Post.objects.create(text='пост', author=self.author)
+        path = self.write(
+            'comments.csv',
+            'post,author,text,created\n'
+            f'{post.pk},legacy_reader,"много, строк\nв поле",'
+            '2020-01-01 12:00\n'
+            '999999,legacy_reader,никуда,\n')
+        call_command('import_content', 'comments', path, stdout=StringIO())
+        comment = Comment.objects.get()
+        self.assertEqual(comment.text, 'много, строк\nв поле')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+        path = self.write('follows.jsonl', json.dumps(
+            {'user': 'legacy_reader', 'author': 'legacy_author'}) + '\n')
+        call_command('import_content', 'follows', path, stdout=StringIO())
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+        self.assertTrue(self.reader.timeline.filter(post=post).exists())
+
+    def test_posts_import_fans_out_without_clearing_feeds(self):
+        """Импорт постов только дополняет ленты подписчиков автора."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        bystander = User.objects.create(username='bystander')
+        other = Post.objects.create(text='чужой', author=self.reader)
+        # Полная пересборка удалила бы эту запись: подписок у него нет.
+        TimelineEntry.objects.create(user=bystander, post=other,
+                                     author=self.reader,
+                                     pub_date=other.pub_date)
+        with mock.patch('posts.timeline.rebuild',
+                        side_effect=AssertionError):
+            call_command('import_content', 'posts', self.posts_file(),
+                         stdout=StringIO())
+        self.assertEqual(self.reader.timeline.count(), NUMBER_OF_POSTS)
+        self.assertTrue(bystander.timeline.exists())
+
+    def test_follows_import_rebuilds_only_importing_users(self):
+        post = Post.objects.create(text='пост', author=self.author)
+        bystander = User.objects.create(username='bystander')
+        TimelineEntry.objects.create(user=bystander, post=post,
+                                     author=self.author,
+                                     pub_date=post.pub_date)
+        path = self.write('follows.jsonl', json.dumps(
+            {'user': 'legacy_reader', 'author': 'legacy_author'}) + '\n')
+        call_command('import_content', 'follows', path, stdout=StringIO())
+        self.assertTrue(self.reader.timeline.filter(post=post).exists())
+        self.assertTrue(bystander.timeline.exists())
+
+    def test_offsets_point_to_row_boundaries(self):
+        path = self.write('rows.csv', 'a,b\n1,"x\ny"\n2,z\n')
+        rows = list(read_rows(path))
+        self.assertEqual([row for row, _ in rows],
+                         [{'a': '1', 'b': 'x\ny'}, {'a': '2', 'b': 'z'}])
+        resumed = list(read_rows(path, rows[0][1]))
+        self.assertEqual([row for row, _ in resumed], [{'a': '2', 'b': 'z'}])
@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+from posts.utils import KeysetPaginator, decode_cursor, encode_cursor
+
+NUMBER_OF_TEST_POSTS: int = 23
+FULL_PAGE: int = 10
+LAST_PAGE: int = 3
+
+User = get_user_model()
+
+
+class KeysetPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='keyset_user')
+        cls.group = Group.objects.create(title='Группа', slug='keyset',
+                                         description='курсоры')
+        Post.objects.bulk_create([
+            Post(text=f'пост {i}', author=cls.author, group=cls.group)
+            for i in range(NUMBER_OF_TEST_POSTS)
+        ])
+        cls.ordered = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def test_cursor_roundtrip(self):
+        """Токен курсора обратим, битый токен игнорируется."""
+        token = encode_cursor(['2022-12-01 10:00:00+00:00', 5])
+        self.assertEqual(decode_cursor(token),
+                         ['2022-12-01 10:00:00+00:00', 5])
+        self.assertIsNone(decode_cursor('не-токен'))
+
+    def test_walk_forward_and_back(self):
+        """Проход вперёд и назад отдаёт все посты без пропусков."""
+        paginator = KeysetPaginator(Post.objects.all(), FULL_PAGE)
+        page = paginator.get_page()
+        self.assertFalse(page.has_previous())
+        seen = list(page)
+        pages = [page]
+        while page.has_next():
+            page = paginator.get_page(after=page.next_cursor)
+            seen.extend(page)
+            pages.append(page)
+        self.assertEqual(seen, self.ordered)
+        self.assertEqual(len(pages[-1]), LAST_PAGE)
+        back = paginator.get_page(before=pages[-1].previous_cursor)
+        self.assertEqual(list(back), list(pages[-2]))
+        self.assertTrue(back.has_previous())
+
+    def test_list_views_accept_cursor(self):
+        """Все ленты понимают параметр after."""
+        token = KeysetPaginator(Post.objects.all(),
+                                FULL_PAGE).cursor_for(self.ordered[0])
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, {'after': token})
+                page_obj = response.context['page_obj']
+                self.assertEqual(list(page_obj), self.ordered[1:11])
+                self.assertContains(response, '?after=')
+
+    def test_next_link_switches_to_cursor(self):
+        """«Следующая» со страницы с номером ведёт в режим курсоров."""
+        reader = User.objects.create(username='keyset_reader')
+        Follow.objects.create(user=reader, author=self.author)
+        self.client.force_login(reader)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, {'page': 2})
+                cursor = response.context['page_obj'].next_cursor
+                self.assertContains(response, f'href="?after={cursor}"')
+                self.assertContains(response, '?page=3"')
+                response = self.client.get(url, {'after': cursor})
+                self.assertEqual(list(response.context['page_obj']),
+                                 self.ordered[20:])
@@ -0,0 +1,39 @@
+from django.core.paginator import Paginator
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.utils import ELLIPSIS, POST_PER_PAGE, elided_page_range
+
+
+class ElidedPageRangeTest(SimpleTestCase):
+    def window(self, number, pages=100):
+        paginator = Paginator(range(pages * POST_PER_PAGE), POST_PER_PAGE)
+        return list(elided_page_range(paginator, number))
+
+    def test_middle_page(self):
+        """Края, окно вокруг текущей страницы и пропуски."""
+        self.assertEqual(self.window(50),
+                         [1, ELLIPSIS, 48, 49, 50, 51, 52, ELLIPSIS, 100])
+
+    def test_near_edges(self):
+        self.assertEqual(self.window(1), [1, 2, 3, ELLIPSIS, 100])
+        self.assertEqual(self.window(4), [1, 2, 3, 4, 5, 6, ELLIPSIS, 100])
+        self.assertEqual(self.window(100), [1, ELLIPSIS, 98, 99, 100])
+
+    def test_few_pages_are_not_elided(self):
+        self.assertEqual(self.window(3, pages=7), list(range(1, 8)))
+
+
+class PaginatorTemplateTest(TestCase):
+    def test_only_window_is_rendered(self):
+        author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(text=f'пост {i}', author=author)
+            for i in range(POST_PER_PAGE * 20))
+        response = self.client.get(reverse('posts:index') + '?page=10')
+        self.assertContains(response, '?page=12"')
+        self.assertNotContains(response, '?page=13"')
+        self.assertContains(response, '?page=8"')
+        self.assertNotContains(response, '?page=7"')
+        self.assertContains(response, ELLIPSIS, count=2)
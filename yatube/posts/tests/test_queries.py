@@ -0,0 +1,90 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+FULL_PAGE: int = 10
+
+User = get_user_model()
+
+
+class QueryCountTest(TestCase):
+    """Число запросов страницы не зависит от числа постов на ней."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='queries',
+                                         description='запросы')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def add_author_with_posts(self, number):
+        author = User.objects.create(username=f'author_{number}')
+        Follow.objects.create(user=self.reader, author=author)
+        for i in range(number):
+            post = Post.objects.create(text=f'пост {i}', author=author,
+                                       group=self.group)
+        Comment.objects.bulk_create([
+            Comment(post=post, author=self.reader, text=f'коммент {i}')
+            for i in range(number)
+        ])
+        return author, post
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        return len(context)
+
+    def urls(self, author, post):
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': author.username}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        ]
+
+    def test_constant_queries(self):
+        small = [self.count_queries(url)
+                 for url in self.urls(*self.add_author_with_posts(1))]
+        big = [self.count_queries(url)
+               for url in self.urls(*self.add_author_with_posts(FULL_PAGE))]
+        self.assertEqual(small, big)
+
+
+class QueryPlanTest(TestCase):
+    """Ленты читаются по индексам, без временных сортировок."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='plan_reader')
+        cls.author = User.objects.create(username='plan_author')
+        group = Group.objects.create(title='Группа', slug='plans',
+                                     description='планы')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(FULL_PAGE + 1):
+            post = Post.objects.create(text=f'пост {i}', author=cls.author,
+                                       group=group)
+        Comment.objects.create(post=post, author=cls.reader, text='коммент')
+
+    def test_no_temp_sorts(self):
+        out = StringIO()
+        call_command('explain_views', strict=True, stdout=out)
+        self.assertIn('Временных сортировок нет', out.getvalue())
+
+    def test_follow_is_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.reader, author=self.author)
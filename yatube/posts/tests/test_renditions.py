@@ -0,0 +1,141 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, features
+
+from posts import renditions
+from posts.models import Post, Rendition, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def photo(width, height, mode='RGB', image_format='JPEG'):
+    buffer = BytesIO()
+    Image.new(mode, (width, height)).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class RenditionTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='photographer')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create(self, content, name='photo.jpg'):
+        return Post.objects.create(
+            text='с картинкой', author=self.author,
+            image=SimpleUploadedFile(name, content))
+
+    def render(self, post):
+        return Template(
+            '{% load post_images %}{% post_image post "card-img" %}'
+        ).render(Context({'post': post}))
+
+    def test_build_makes_named_widths(self):
+        """Готовятся все варианты в пропорциях карточки, не шире оригинала."""
+        post = self.create(photo(2000, 1000))
+        renditions.build(post.pk)
+        self.assertEqual(
+            list(post.renditions.order_by('width').values_list(
+                'name', 'width', 'height')),
+            [('small', 480, 170), ('medium', 960, 339),
+             ('large', 1440, 509)])
+        small = self.create(photo(600, 300), 'small.jpg')
+        renditions.build(small.pk)
+        self.assertEqual(
+            list(small.renditions.order_by('width').values_list(
+                'name', 'width', 'height')),
+            [('small', 480, 170), ('medium', 600, 212)])
+
+    def test_rebuild_replaces_old_files(self):
+        post = self.create(photo(1000, 500))
+        old = renditions.build(post.pk)
+        post.image = SimpleUploadedFile('other.png',
+                                        photo(500, 500, 'RGBA', 'PNG'))
+        post.save()
+        new = renditions.build(post.pk)
+        self.assertEqual(Rendition.objects.filter(post=post).count(),
+                         len(new))
+        self.assertTrue(new[0].file.endswith('.png'))
+        self.assertFalse(
+            any(post.image.storage.exists(item.file) for item in old))
+
+    def test_tag_renders_srcset_without_storage(self):
+        """Тег выводит srcset и размеры, не обращаясь к хранилищам."""
+        post = self.create(photo(2000, 1000))
+        renditions.build(post.pk)
+        post = Post.objects.get(pk=post.pk)
+        with mock.patch('django.core.files.storage.FileSystemStorage.url',
+                        side_effect=AssertionError), \
+                mock.patch('sorl.thumbnail.default.kvstore.get',
+                           side_effect=AssertionError):
+            html = self.render(post)
+        self.assertIn('srcset="/media/posts/renditions/', html)
+        self.assertIn('480w', html)
+        self.assertIn('1440w', html)
+        self.assertIn('sizes="(max-width: 576px) 100vw, 960px"', html)
+        self.assertIn('width="1440" height="509"', html)
+        self.assertIn('loading="lazy"', html)
+
+    @skipUnless(features.check('webp'), 'Pillow собран без WebP')
+    def test_build_makes_webp_copies(self):
+        post = self.create(photo(2000, 1000))
+        for rendition in renditions.build(post.pk):
+            self.assertTrue(rendition.webp_file.endswith('.webp'))
+            self.assertTrue(post.image.storage.exists(rendition.webp_file))
+
+    def test_build_without_webp_support(self):
+        post = self.create(photo(1000, 500))
+        with mock.patch('posts.renditions.features.check',
+                        return_value=False):
+            created = renditions.build(post.pk)
+        self.assertTrue(created)
+        self.assertFalse(any(rendition.webp_url for rendition in created))
+        self.assertNotIn('<picture>',
+                         self.render(Post.objects.get(pk=post.pk)))
+
+    def test_tag_renders_webp_source(self):
+        """Варианты WebP отдаются через <picture>, JPEG остаётся в <img>."""
+        post = self.create(photo(1000, 500))
+        renditions.build(post.pk)
+        for rendition in Rendition.objects.filter(post=post):
+            rendition.webp_url = f'/media/{rendition.name}.webp'
+            rendition.save()
+        html = self.render(Post.objects.get(pk=post.pk))
+        self.assertTrue(html.startswith(
+            '<picture><source type="image/webp" srcset="/media/small.webp '
+            '480w, /media/medium.webp 960w, /media/large.webp 1000w"'))
+        self.assertIn('<img class="card-img" src="/media/posts/renditions/',
+                      html)
+        self.assertTrue(html.endswith('</picture>'))
+
+    def test_stale_renditions_are_ignored(self):
+        """Варианты прежней картинки не выводятся."""
+        post = self.create(photo(1000, 500))
+        renditions.build(post.pk)
+        Post.objects.filter(pk=post.pk).update(image='posts/new.jpg')
+        self.assertEqual(self.render(Post.objects.get(pk=post.pk)), '')
+
+    def test_cards_use_renditions(self):
+        post = self.create(photo(1000, 500))
+        renditions.build(post.pk)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'srcset=')
+        self.assertContains(response, 'loading="lazy"')
@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Group, Post
+
+NUMBER_OF_TEST_POSTS: int = 13
+
+User = get_user_model()
+
+
+class PostSearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='search_user')
+        cls.other = User.objects.create(username='other_user')
+        cls.group = Group.objects.create(title='Группа', slug='search',
+                                         description='поиск')
+        cls.best = Post.objects.create(
+            text='Ежик ежик ежик в тумане', author=cls.author,
+            group=cls.group)
+        cls.plain = Post.objects.create(
+            text='Ежик и лошадка, а потом долгий рассказ о тумане '
+                 'и о том, как они пили чай с вареньем',
+            author=cls.other)
+        Post.objects.bulk_create([
+            Post(text=f'пост про кота {i}', author=cls.author)
+            for i in range(NUMBER_OF_TEST_POSTS)
+        ])
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def test_results_are_ranked(self):
+        """Более релевантный пост идёт первым."""
+        posts, next_cursor = search.search('ежик')
+        self.assertEqual(posts, [self.best, self.plain])
+        self.assertIsNone(next_cursor)
+
+    def test_filters(self):
+        """Фильтры по группе и автору сужают выдачу."""
+        self.assertEqual(search.search('ежик', group=self.group)[0],
+                         [self.best])
+        self.assertEqual(search.search('ежик', author=self.other)[0],
+                         [self.plain])
+
+    def test_cursor_walks_all_results(self):
+        """Курсор обходит все результаты без повторов."""
+        seen = []
+        posts, after = search.search('кота')
+        seen.extend(posts)
+        while after:
+            posts, after = search.search('кота', after=after)
+            seen.extend(posts)
+        self.assertEqual(len(seen), NUMBER_OF_TEST_POSTS)
+        self.assertEqual(len(set(seen)), NUMBER_OF_TEST_POSTS)
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        post = Post.objects.create(text='носорог', author=self.author)
+        self.assertEqual(search.search('носорог')[0], [post])
+        Post.objects.filter(pk=post.pk).update(text='бегемот')
+        self.assertEqual(search.search('носорог')[0], [])
+        self.assertEqual(search.search('бегемот')[0], [post])
+        post.delete()
+        self.assertEqual(search.search('бегемот')[0], [])
+
+    def test_operators_are_escaped(self):
+        """Синтаксис FTS5 во вводе не ломает запрос."""
+        self.assertEqual(search.search('"ежик* (')[0],
+                         [self.best, self.plain])
+        self.assertEqual(search.search('!!!'), ([], None))
+
+    def test_search_page(self):
+        """Страница поиска показывает найденное и ссылку дальше."""
+        response = self.client.get(reverse('posts:search'), {'q': 'кота'})
+        self.assertEqual(len(response.context['posts']), 10)
+        self.assertContains(response, 'after=')
+        response = self.client.get(reverse('posts:search'),
+                                   {'q': 'ежик', 'group': 'search'})
+        self.assertEqual(response.context['posts'], [self.best])
+
+    def test_admin_search(self):
+        """Поиск в админке идёт по тому же индексу."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'ЕЖИК'})
+        self.assertEqual(
+            set(response.context['cl'].result_list),
+            {self.best, self.plain})
@@ -0,0 +1,60 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.management.commands.bench_views import MUTATING_ROUTES
+from posts.models import Comment, Follow, Post, TimelineEntry, UserStats
+from posts.urls import urlpatterns
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedAndBenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('seed_data', users=30, groups=3, posts=120,
+                     follows=5, comments=2, images=0.2, seed=1,
+                     stdout=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_seed_keeps_derived_data_consistent(self):
+        """После заполнения счётчики и ленты совпадают с данными."""
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(
+            sum(UserStats.objects.values_list('posts_count', flat=True)),
+            Post.objects.count())
+        self.assertEqual(
+            sum(Post.objects.values_list('comments_count', flat=True)),
+            Comment.objects.count())
+        if Follow.objects.exists():
+            self.assertTrue(TimelineEntry.objects.exists())
+        dates = list(Post.objects.order_by('pk').values_list(
+            'pub_date', flat=True))
+        self.assertEqual(dates, sorted(dates))
+
+    def test_benchmark_covers_every_route(self):
+        """Бенчмарк проходит все читающие адреса и пишет JSON."""
+        output = os.path.join(TEMP_MEDIA_ROOT, 'bench.json')
+        follows = Follow.objects.count()
+        call_command('bench_views', requests=2, warmup=0, output=output,
+                     stdout=StringIO())
+        with open(output) as report_file:
+            report = json.load(report_file)
+        names = {pattern.name for pattern in urlpatterns if pattern.name}
+        self.assertEqual(set(report['routes']), names - MUTATING_ROUTES)
+        self.assertEqual(Follow.objects.count(), follows)
+        for result in report['routes'].values():
+            self.assertIn('p99', result['latency'])
+            self.assertLess(max(result['status']), 500)
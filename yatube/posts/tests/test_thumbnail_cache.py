@@ -0,0 +1,74 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import thumbnail_cache
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+KV_GET = 'sorl.thumbnail.kvstores.cached_db_kvstore.KVStore._get_raw'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='photographer')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        thumbnail_cache.lru.clear()
+        self.post = Post.objects.create(
+            text='с картинкой', author=self.author,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF))
+
+    def test_warm_list_page_skips_kvstore(self):
+        """Прогретая страница не обращается к хранилищу ключей sorl."""
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(thumbnail_cache.lru.misses, 1)
+        cache.clear()
+        with mock.patch(KV_GET, side_effect=AssertionError):
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertEqual(thumbnail_cache.lru.hits, 1)
+
+    def test_image_change_forgets_thumbnails(self):
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(len(thumbnail_cache.lru), 1)
+        self.post.image = SimpleUploadedFile('other.gif', SMALL_GIF)
+        self.post.save()
+        self.assertEqual(len(thumbnail_cache.lru), 0)
+
+    def test_post_delete_forgets_thumbnails(self):
+        self.client.get(reverse('posts:index'))
+        self.post.delete()
+        self.assertEqual(len(thumbnail_cache.lru), 0)
+
+    def test_lru_is_bounded(self):
+        lru = thumbnail_cache.ThumbnailLRU(max_entries=2)
+        for name in ('a', 'b', 'c'):
+            lru.set((name, '1x1', ()), name)
+        self.assertIsNone(lru.get(('a', '1x1', ())))
+        self.assertEqual(lru.get(('c', '1x1', ())), 'c')
+        self.assertEqual((lru.hits, lru.misses), (1, 1))
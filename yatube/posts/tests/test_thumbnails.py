@@ -0,0 +1,39 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from sorl.thumbnail import default
+
+from posts import thumbnails
+from posts.models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPregenerationTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_generate_all_geometries(self):
+        """Миниатюры всех размеров из шаблонов готовы заранее."""
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), (200, 0, 0)).save(buffer, 'JPEG')
+        post = Post(text='с картинкой',
+                    author=User.objects.create(username='painter'))
+        post.image.save('big.jpg', ContentFile(buffer.getvalue()))
+        thumbnails.generate(post.image.name)
+        for geometry, options in thumbnails.GEOMETRIES:
+            with self.subTest(geometry=geometry):
+                thumbnail = thumbnails.get_thumbnail(
+                    post.image.name, geometry, **options)
+                self.assertTrue(thumbnail.exists())
+                self.assertIsNotNone(default.kvstore.get(thumbnail))
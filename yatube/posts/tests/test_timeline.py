@@ -0,0 +1,88 @@
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='reader')
+        cls.author = User.objects.create(username='writer')
+        cls.old_post = Post.objects.create(text='старый', author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_follow_backfills_and_new_post_fans_out(self):
+        """Подписка дозаполняет ленту, новый пост раздаётся подписчикам."""
+        self.client.get(reverse('posts:profile_follow',
+                                args=[self.author.username]))
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+        new_post = Post.objects.create(text='новый', author=self.author)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [new_post, self.old_post])
+
+    def test_unfollow_prunes(self):
+        """Отписка вычищает посты автора из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.get(reverse('posts:profile_unfollow',
+                                args=[self.author.username]))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists())
+
+    def test_celebrity_posts_are_pulled(self):
+        """Посты «звёзд» не раздаются, а подтягиваются при чтении."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        with mock.patch.object(timeline, 'FANOUT_LIMIT', 0):
+            post = Post.objects.create(text='звёздный', author=self.author)
+            self.assertFalse(
+                TimelineEntry.objects.filter(post=post).exists())
+            self.assertIn(post, timeline.feed(self.reader))
+
+    def test_follow_backfills_whole_history(self):
+        """В ленту попадает вся история автора, а не последние посты."""
+        Post.objects.bulk_create(
+            Post(text=f'пост {i}', author=self.author)
+            for i in range(timeline.BATCH_SIZE + 5))
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(),
+            Post.objects.filter(author=self.author).count())
+
+    def test_migration_fills_existing_follows(self):
+        """Миграция заполняет ленты по уже существующим подпискам."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        migration = import_module('posts.migrations.0019_backfill_timeline')
+        migration.fill_timelines(apps, None)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+
+    def test_rebuild_goes_one_reader_at_a_time(self):
+        """Полная пересборка чистит и заполняет ленту в одной транзакции."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        stranger = User.objects.create(username='stranger')
+        TimelineEntry.objects.create(user=stranger, post=self.old_post,
+                                     author=self.author,
+                                     pub_date=self.old_post.pub_date)
+        with mock.patch('posts.timeline.transaction.atomic',
+                        wraps=timeline.transaction.atomic) as atomic:
+            timeline.rebuild()
+        # Одна транзакция на единственного читателя с подписками.
+        self.assertEqual(atomic.call_args_list.count(mock.call()), 1)
+        self.assertFalse(stranger.timeline.exists())
+        self.assertTrue(self.reader.timeline.filter(
+            post=self.old_post).exists())
@@ -0,0 +1,187 @@
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+from importlib import import_module
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import write_behind
+from posts.models import (Comment, Follow, ImportCheckpoint, Post,
+                          TimelineEntry, User, UserStats,
+                          WriteBehindCheckpoint)
+
+TEMP_DIR = tempfile.mkdtemp()
+QUEUE_PATH = os.path.join(TEMP_DIR, 'queue.sqlite3')
+
+
+@override_settings(WRITE_BEHIND_PATH=QUEUE_PATH)
+class WriteBehindTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='пост', author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.queue = write_behind.get_queue()
+
+    def tearDown(self):
+        self.queue.forget(float('inf'))
+
+    def detail(self, client):
+        return client.get(reverse('posts:post_detail', args=(self.post.pk,)))
+
+    def test_comment_is_queued_and_visible_to_author(self):
+        """Комментарий ждёт в очереди, но его автор его уже видит."""
+        self.client.post(reverse('posts:add_comment', args=(self.post.pk,)),
+                         {'text': 'скоро будет'})
+        self.assertFalse(Comment.objects.exists())
+        self.assertContains(self.detail(self.client), 'скоро будет')
+        self.assertNotContains(self.detail(Client()), 'скоро будет')
+
+    def test_flush_writes_comments_and_counter(self):
+        for i in range(3):
+            write_behind.add_comment(self.reader, self.post, f'мнение {i}')
+        self.assertEqual(write_behind.drain(), 3)
+        self.assertEqual(
+            list(Comment.objects.order_by('pk').values_list(
+                'text', flat=True)),
+            ['мнение 0', 'мнение 1', 'мнение 2'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 3)
+        self.assertTrue(self.queue.is_empty())
+        response = self.detail(self.client)
+        self.assertEqual(len(response.context['comments']), 3)
+
+    def test_follow_is_queued(self):
+        """Подписка видна сразу, а применяется при сбросе."""
+        self.client.get(
+            reverse('posts:profile_follow', args=(self.author.username,)))
+        self.assertFalse(Follow.objects.exists())
+        self.assertTrue(write_behind.pending_follow(self.reader, self.author))
+        write_behind.drain()
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 1)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.post).exists())
+
+    def test_follow_and_unfollow_collapse(self):
+        """Подписка и отписка в одной пачке ничего не меняют."""
+        write_behind.follow(self.reader, self.author)
+        write_behind.unfollow(self.reader, self.author)
+        self.assertIs(write_behind.pending_follow(self.reader, self.author),
+                      False)
+        write_behind.drain()
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(UserStats.objects.filter(
+            user=self.author, followers_count__gt=0).exists())
+
+    def test_queued_unfollow(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,)))
+        self.assertTrue(Follow.objects.exists())
+        write_behind.drain()
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 0)
+
+    def test_replay_after_crash_does_not_duplicate(self):
+        """Если строки не удалились из очереди, повтор их пропустит."""
+        write_behind.add_comment(self.reader, self.post, 'один раз')
+        with mock.patch.object(self.queue, 'forget'):
+            self.assertEqual(write_behind.flush(), 1)
+        self.assertFalse(self.queue.is_empty())
+        self.assertEqual(write_behind.flush(), 0)
+        self.assertTrue(self.queue.is_empty())
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_flush_keeps_queued_date_without_touching_field(self):
+        """Дата берётся из очереди, а флаг auto_now_add поля не меняется.
+
+        Иначе сохранение комментария в другом потоке в это время
+        записало бы created=NULL.
+        """
+        queued = datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        with mock.patch('posts.write_behind.time.time',
+                        return_value=queued.timestamp()):
+            write_behind.add_comment(self.reader, self.post, 'давно')
+        field = Comment._meta.get_field('created')
+        flags = []
+
+        def watch(execute, sql, params, many, context):
+            flags.append(field.auto_now_add)
+            return execute(sql, params, many, context)
+        with connection.execute_wrapper(watch):
+            write_behind.drain()
+        self.assertTrue(flags)
+        self.assertTrue(all(flags))
+        self.assertEqual(Comment.objects.get().created, queued)
+
+    def test_checkpoint_is_separate_from_import(self):
+        write_behind.add_comment(self.reader, self.post, 'отметка')
+        write_behind.drain()
+        checkpoint = WriteBehindCheckpoint.objects.get(
+            source=self.queue.source)
+        self.assertEqual(checkpoint.rows, 1)
+        self.assertGreater(checkpoint.last_id, 0)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_worker_starts_with_web_process(self):
+        """Очередь после перезапуска сбрасывается без новых записей."""
+        sys.modules.pop('yatube.wsgi', None)
+        with mock.patch.dict(os.environ, YATUBE_WRITE_BEHIND=QUEUE_PATH), \
+                mock.patch('posts.write_behind.start_worker') as start:
+            import_module('yatube.wsgi')
+        start.assert_called_once_with()
+
+    def test_recreated_queue_file_starts_over(self):
+        """Новый файл по тому же пути не теряет строк из-за старой точки."""
+        for i in range(3):
+            write_behind.add_comment(self.reader, self.post, f'старое {i}')
+        write_behind.drain()
+        old_source = self.queue.source
+        self.queue._connection.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(QUEUE_PATH + suffix):
+                os.remove(QUEUE_PATH + suffix)
+        write_behind._queues.clear()
+        self.queue = write_behind.get_queue()
+        write_behind.add_comment(self.reader, self.post, 'новое')
+        self.assertNotEqual(self.queue.source, old_source)
+        self.assertEqual(write_behind.drain(), 1)
+        self.assertTrue(self.queue.is_empty())
+        self.assertTrue(Comment.objects.filter(text='новое').exists())
+
+    def test_comment_to_deleted_post_is_dropped(self):
+        post = Post.objects.create(text='удалят', author=self.author)
+        write_behind.add_comment(self.reader, post, 'поздно')
+        post.delete()
+        write_behind.drain()
+        self.assertFalse(Comment.objects.exists())
+
+
+class WriteBehindDisabledTest(TestCase):
+    def test_disabled_by_default(self):
+        self.assertFalse(write_behind.enabled())
+        self.assertIsNone(write_behind.pending_follow(None, None))
@@ -0,0 +1,99 @@
+"""LRU в памяти процесса перед хранилищем ключей sorl-thumbnail.
+
+Каждый {% thumbnail %} спрашивает у хранилища ключей sorl (кэш
+Django, а при промахе — база), есть ли готовая миниатюра. Здесь
+готовые миниатюры (имя файла и размеры, по ним считаются url, width
+и height) запоминаются в ограниченном LRU по имени исходной картинки,
+геометрии и опциям, так что прогретая страница списка не делает ни
+одного обращения к хранилищу ключей.
+
+Миниатюры исходной картинки забываются, когда у поста меняется или
+удаляется картинка (см. signals). Новые картинки получают новые имена
+файлов, поэтому в других процессах старые записи просто перестают
+запрашиваться и вытесняются.
+"""
+import threading
+from collections import OrderedDict
+
+from sorl.thumbnail.base import ThumbnailBackend
+
+from core.metrics import record_cache
+
+MAX_ENTRIES = 4096
+
+
+class ThumbnailLRU:
+    """Ограниченный по числу записей LRU со счётчиками попаданий."""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            thumbnail = self._entries.get(key)
+            if thumbnail is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        record_cache('thumbnail', hits=int(thumbnail is not None),
+                     misses=int(thumbnail is None))
+        return thumbnail
+
+    def set(self, key, thumbnail):
+        with self._lock:
+            self._entries[key] = thumbnail
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def forget(self, source_name):
+        """Забывает все миниатюры исходной картинки."""
+        with self._lock:
+            for key in [key for key in self._entries
+                        if key[0] == source_name]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+lru = ThumbnailLRU()
+
+
+def make_key(source, geometry, options):
+    name = getattr(source, 'name', None) or str(source)
+    return name, geometry, tuple(sorted(
+        (key, repr(value)) for key, value in options.items()))
+
+
+def forget(source_name):
+    if source_name:
+        lru.forget(source_name)
+
+
+class CachedThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, сначала смотрящий в LRU процесса.
+
+    Подключается настройкой THUMBNAIL_BACKEND.
+    """
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        key = make_key(file_, geometry_string, options)
+        thumbnail = lru.get(key)
+        if thumbnail is not None:
+            return thumbnail
+        thumbnail = super().get_thumbnail(file_, geometry_string, **options)
+        # Заглушки и миниатюры без размеров (картинки нет) не кэшируем.
+        if getattr(thumbnail, '_size', None) is not None:
+            lru.set(key, thumbnail)
+        return thumbnail
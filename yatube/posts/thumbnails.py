@@ -0,0 +1,103 @@
+"""Фоновая подготовка миниатюр картинок постов.
+
+Шаблоны вызывают {% thumbnail %} лениво, и первый читатель ждёт
+декодирования и кадрирования картинки. Здесь миниатюры всех
+используемых шаблонами размеров и варианты для srcset (renditions)
+готовятся сразу после сохранения поста в пуле потоков, а команда
+generate_thumbnails делает то же для уже загруженных картинок.
+
+Когда картинку поста заменяют или пост удаляют, старый файл вместе
+с его миниатюрами и вариантами удаляется после коммита (discard).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from sorl.thumbnail import delete, get_thumbnail
+
+from . import renditions
+from .models import Post
+
+# Должно совпадать с вызовами {% thumbnail %} в шаблонах.
+GEOMETRIES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+MAX_WORKERS = 2
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=MAX_WORKERS, thread_name_prefix='thumbnails')
+    return _executor
+
+
+def generate(image_name):
+    """Создаёт все миниатюры картинки и записывает их в хранилище sorl."""
+    for geometry, options in GEOMETRIES:
+        try:
+            get_thumbnail(image_name, geometry, **options)
+        except Exception:
+            logger.exception('Не удалось создать миниатюру %s %s',
+                             image_name, geometry)
+
+
+def prepare(post_id, image_name):
+    """Миниатюры sorl и варианты картинки для srcset."""
+    generate(image_name)
+    try:
+        renditions.build(post_id)
+    except Exception:
+        logger.exception('Не удалось создать варианты картинки поста %s',
+                         post_id)
+
+
+def _prepare_in_background(post_id, image_name):
+    try:
+        prepare(post_id, image_name)
+    finally:
+        # У потока пула своё соединение с базой, закрываем его сами.
+        close_old_connections()
+        connection.close()
+
+
+def schedule(post):
+    """Ставит подготовку картинок поста в очередь после коммита."""
+    if not post.image:
+        return
+    post_id, image_name = post.pk, post.image.name
+    if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+        # Базу в памяти (тесты) другой поток не видит.
+        transaction.on_commit(lambda: prepare(post_id, image_name))
+        return
+    transaction.on_commit(lambda: get_executor().submit(
+        _prepare_in_background, post_id, image_name))
+
+
+def _delete(image_name, rendition_files):
+    for file in rendition_files:
+        default_storage.delete(file)
+    # seed_data и импорт ставят один файл нескольким постам.
+    if Post.objects.filter(image=image_name).exists():
+        return
+    try:
+        delete(image_name)
+    except Exception:
+        logger.exception('Не удалось удалить картинку %s', image_name)
+
+
+def discard(image_name, rendition_files=()):
+    """Удаляет после коммита картинку, её миниатюры sorl и варианты."""
+    if not image_name:
+        return
+    rendition_files = list(rendition_files)
+    transaction.on_commit(lambda: _delete(image_name, rendition_files))
@@ -0,0 +1,149 @@
+"""Лента подписок с раздачей постов при записи (fan-out on write).
+
+Новый пост сразу копируется в ленты подписчиков автора, поэтому чтение
+ленты сводится к диапазонному проходу по индексу (user, pub_date)
+одной таблицы. Для авторов с огромным числом подписчиков раздача
+не делается: их посты подтягиваются в ленту читателя при чтении.
+
+Новый подписчик получает в ленту всю историю автора, как и прежний
+запрос с JOIN по подпискам; посты копируются пачками по BATCH_SIZE.
+
+После импорта ленты дополняются только по затронутым авторам
+(fan_out_authors) или читателям (rebuild с user_ids). Полная
+пересборка идёт по одному читателю в транзакции, так что ни одна
+лента не бывает видна пустой или недостроенной.
+"""
+from django.db import transaction
+from django.db.models import F, Max
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+FANOUT_LIMIT = 10000
+BATCH_SIZE = 1000
+FEED_ORDERING = ('-feed_date', '-feed_post')
+
+
+def _entries(user_ids, posts, entry_model=TimelineEntry):
+    return [
+        entry_model(user_id=user_id, post_id=post.pk,
+                    author_id=post.author_id, pub_date=post.pub_date)
+        for user_id in user_ids
+        for post in posts
+    ]
+
+
+def is_celebrity(author_id):
+    return UserStats.objects.filter(
+        user_id=author_id, followers_count__gt=FANOUT_LIMIT).exists()
+
+
+def fan_out(post):
+    """Раздаёт новый пост в ленты всех подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True).iterator(chunk_size=BATCH_SIZE)
+    batch = []
+    for user_id in follower_ids:
+        batch.append(user_id)
+        if len(batch) == BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(
+                _entries(batch, [post]), ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(
+            _entries(batch, [post]), ignore_conflicts=True)
+
+
+def backfill(user_id, author_id, since=None, post_model=Post,
+             entry_model=TimelineEntry):
+    """Копирует посты автора в ленту нового подписчика."""
+    posts = post_model.objects.filter(author_id=author_id).only(
+        'pk', 'author_id', 'pub_date')
+    if since is not None:
+        posts = posts.filter(pub_date__gt=since)
+    batch = []
+    for post in posts.order_by('-pub_date').iterator(chunk_size=BATCH_SIZE):
+        batch.append(post)
+        if len(batch) == BATCH_SIZE:
+            entry_model.objects.bulk_create(
+                _entries([user_id], batch, entry_model),
+                ignore_conflicts=True)
+            batch = []
+    entry_model.objects.bulk_create(
+        _entries([user_id], batch, entry_model), ignore_conflicts=True)
+
+
+def fan_out_authors(author_ids):
+    """Раздаёт все посты авторов их подписчикам, например после импорта.
+
+    Записи только добавляются, поэтому ленты остаются видны целиком.
+    """
+    for author_id in author_ids:
+        if is_celebrity(author_id):
+            continue
+        follower_ids = Follow.objects.filter(
+            author_id=author_id).values_list('user_id', flat=True)
+        with transaction.atomic():
+            for user_id in follower_ids.iterator(chunk_size=BATCH_SIZE):
+                backfill(user_id, author_id)
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    TimelineEntry.objects.filter(user_id=user_id,
+                                 author_id=author_id).delete()
+
+
+def pull(user_id):
+    """Подтягивает в ленту свежие посты авторов-«звёзд».
+
+    Их посты не раздаются при записи, поэтому материализуются
+    лениво — только для тех, кто действительно читает ленту.
+    """
+    celebrities = Follow.objects.filter(
+        user_id=user_id,
+        author__stats__followers_count__gt=FANOUT_LIMIT,
+    ).values_list('author_id', flat=True)
+    for author_id in celebrities:
+        latest = TimelineEntry.objects.filter(
+            user_id=user_id, author_id=author_id
+        ).aggregate(latest=Max('pub_date'))['latest']
+        backfill(user_id, author_id, since=latest)
+
+
+def feed(user):
+    """Посты ленты подписок пользователя."""
+    pull(user.pk)
+    # Сортировка по колонкам самой ленты идёт по её индексу
+    # (user, pub_date, post), без временного B-дерева.
+    return Post.objects.for_list().filter(
+        timeline_entries__user=user,
+    ).annotate(
+        feed_date=F('timeline_entries__pub_date'),
+        feed_post=F('timeline_entries__post'),
+    ).order_by(*FEED_ORDERING)
+
+
+def rebuild(user_ids=None, follow_model=Follow, post_model=Post,
+            entry_model=TimelineEntry):
+    """Пересобирает ленты по текущим подпискам, по читателю за раз.
+
+    Лента каждого читателя очищается и заполняется в одной транзакции.
+    """
+    follows = follow_model.objects.all()
+    if user_ids is None:
+        # Ленты тех, у кого подписок больше нет.
+        entry_model.objects.exclude(
+            user_id__in=follows.values('user_id')).delete()
+        user_ids = follows.values_list(
+            'user_id', flat=True).distinct().order_by('user_id')
+    for user_id in user_ids:
+        author_ids = list(follows.filter(user_id=user_id).values_list(
+            'author_id', flat=True))
+        with transaction.atomic():
+            entry_model.objects.filter(user_id=user_id).delete()
+            for author_id in author_ids:
+                backfill(user_id, author_id, post_model=post_model,
+                         entry_model=entry_model)
@@ -1,18 +1,30 @@
 from django.urls import path
-from . import views
+from . import api, views
 from django.conf import settings
 from django.conf.urls.static import static
 app_name = "posts"
 urlpatterns = [
     path('', views.index, name="index"),
     path("group/<slug:slug>/", views.group_posts, name="group_list"),
+    path('group/<slug:slug>/export/', views.group_export,
+         name='group_export'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/export/', views.profile_export,
+         name='profile_export'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.new_post, name='post_create'),
     path("posts/<int:post_id>/edit/", views.post_edit, name="post_edit"),
     path('posts/<int:post_id>/comment/', views.add_comment,
          name='add_comment'),
+    path('posts/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path('api/posts/', api.index, name='api_index'),
+    path('api/posts/<int:post_id>/', api.post_detail,
+         name='api_post_detail'),
+    path('api/group/<slug:slug>/', api.group_posts, name='api_group'),
+    path('api/profile/<str:username>/', api.profile, name='api_profile'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
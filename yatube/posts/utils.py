@@ -1,26 +1,215 @@
+import base64
+import json
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
 from .models import Post
-from django.core.paginator import Paginator
 POST_PER_PAGE = 10
+KEYSET_ORDERING = ('-pub_date', '-pk')
+COMMENTS_PER_PAGE = 50
+COMMENT_ORDERING = ('created', 'pk')
+# Сколько номеров страниц показывать вокруг текущей и с каждого края.
+PAGES_ON_EACH_SIDE = 2
+PAGES_ON_ENDS = 1
+ELLIPSIS = '…'
+
+
+def encode_cursor(values):
+    """Упаковывает значения ключа в непрозрачный токен для URL."""
+    raw = json.dumps(values, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен курсора, для битого токена возвращает None."""
+    try:
+        padding = '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(token + padding))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list):
+        return None
+    return values
+
+
+def elided_page_range(paginator, number=1,
+                      on_each_side=PAGES_ON_EACH_SIDE, on_ends=PAGES_ON_ENDS):
+    """Номера страниц для навигации без полного page_range.
+
+    Для ленты в миллион постов page_range — это сто тысяч ссылок.
+    Здесь остаются края и окно вокруг текущей страницы, а пропуски
+    заменяются на ELLIPSIS.
+    """
+    number = paginator.validate_number(number)
+    num_pages = paginator.num_pages
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        yield from paginator.page_range
+        return
+    if number > 1 + on_each_side + on_ends + 1:
+        yield from range(1, on_ends + 1)
+        yield ELLIPSIS
+        start = number - on_each_side
+    else:
+        start = 1
+    if number < num_pages - on_each_side - on_ends - 1:
+        yield from range(start, number + on_each_side + 1)
+        yield ELLIPSIS
+        yield from range(num_pages - on_ends + 1, num_pages + 1)
+    else:
+        yield from range(start, num_pages + 1)
+
+
+class KeysetPage(Page):
+    """Страница курсорной пагинации.
+
+    Номеров страниц нет: вместо них токены соседних страниц
+    next_cursor и previous_cursor.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, 1, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self.paginator.cursor_for(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return self.paginator.cursor_for(self.object_list[0])
 
 
-def paginator(request, post_list):
+class KeysetPaginator(Paginator):
+    """Пагинатор по ключу (pub_date, id) без OFFSET и COUNT(*).
+
+    Каждая страница выбирается одним диапазонным запросом по индексу,
+    поэтому время выборки не зависит от глубины страницы.
+    """
+
+    def __init__(self, object_list, per_page, ordering=KEYSET_ORDERING):
+        super().__init__(object_list, per_page)
+        self.ordering = ordering
+        self.fields = [name.lstrip('-') for name in ordering]
+        self.descending = ordering[0].startswith('-')
+
+    def cursor_for(self, obj):
+        return encode_cursor([
+            getattr(obj, name) for name in self.fields
+        ])
+
+    def _parse(self, token):
+        values = decode_cursor(token) if token else None
+        if values is None or len(values) != len(self.fields):
+            return None
+        model = self.object_list.model
+        annotations = self.object_list.query.annotations
+        parsed = []
+        for name, value in zip(self.fields, values):
+            if name in annotations:
+                field = annotations[name].output_field
+            elif name == 'pk':
+                field = model._meta.pk
+            else:
+                field = model._meta.get_field(name)
+            try:
+                parsed.append(field.to_python(value))
+            except Exception:
+                return None
+        return parsed
+
+    def _seek(self, values, forward):
+        """Условие «строго после курсора» в порядке обхода.
+
+        Записано как диапазон по первому ключу плюс исключение
+        совпадающего префикса, чтобы SQLite использовал индекс.
+        """
+        first, second = self.fields
+        older = self.descending == forward
+        bound = 'lte' if older else 'gte'
+        tie = 'gte' if older else 'lte'
+        return (
+            Q(**{f'{first}__{bound}': values[0]})
+            & ~Q(**{first: values[0], f'{second}__{tie}': values[1]})
+        )
+
+    def page(self, after=None, before=None):
+        after_values = self._parse(after)
+        before_values = None if after_values else self._parse(before)
+        queryset = self.object_list
+        if before_values is not None:
+            reverse = [name.lstrip('-') if name.startswith('-')
+                       else f'-{name}' for name in self.ordering]
+            queryset = queryset.filter(self._seek(before_values, False))
+            rows = list(queryset.order_by(*reverse)[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return KeysetPage(rows, self, True, has_previous)
+        if after_values is not None:
+            queryset = queryset.filter(self._seek(after_values, True))
+        rows = list(queryset.order_by(*self.ordering)[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return KeysetPage(rows[:self.per_page], self, has_next,
+                          after_values is not None)
+
+    def get_page(self, after=None, before=None):
+        return self.page(after=after, before=before)
+
+
+def is_keyset_request(request):
+    return 'after' in request.GET or 'before' in request.GET
+
+
+def keyset_page(request, post_list, per_page=POST_PER_PAGE,
+                ordering=KEYSET_ORDERING):
+    paginator = KeysetPaginator(post_list, per_page, ordering)
+    return paginator.get_page(after=request.GET.get('after'),
+                              before=request.GET.get('before'))
+
+
+def paginator(request, post_list, ordering=KEYSET_ORDERING):
+    if is_keyset_request(request):
+        return keyset_page(request, post_list, ordering=ordering)
+    # Тот же порядок, что и у курсоров, чтобы переход к ним со страницы
+    # с номером продолжал ленту без пропусков и повторов.
+    post_list = post_list.order_by(*ordering)
     paginator = Paginator(post_list, POST_PER_PAGE)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    page = paginator.get_page(request.GET.get('page'))
+    if page.has_next():
+        # «Следующая» ведёт в режим курсоров: дальше без OFFSET
+        # и COUNT(*). Номера страниц вокруг текущей остаются.
+        page.next_cursor = KeysetPaginator(
+            post_list, POST_PER_PAGE, ordering).cursor_for(page[len(page) - 1])
+    return page
 
 
 def get_paginator_helper(request, filter_name='', filter_value=None):
+    """Страница ленты; общее число постов берите из счётчиков."""
+    post_list = Post.objects.for_list()
     if filter_name == 'author':
-        post_list = Post.objects.filter(author=filter_value)
+        post_list = post_list.filter(author=filter_value)
     elif filter_name == 'group':
-        post_list = Post.objects.filter(group=filter_value)
-    else:
-        post_list = Post.objects.all()
-    paginator = Paginator(post_list, POST_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+        post_list = post_list.filter(group=filter_value)
 
     return {
-        'page_obj': page_obj,
-        'count_post': post_list.count()
+        'page_obj': paginator(request, post_list),
     }
+
+
+def comments_page(post, after=None, per_page=COMMENTS_PER_PAGE):
+    """Страница комментариев поста после курсора по (created, id)."""
+    paginator = KeysetPaginator(post.comments.for_list(), per_page,
+                                COMMENT_ORDERING)
+    return paginator.get_page(after=after)
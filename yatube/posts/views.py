@@ -1,14 +1,23 @@
+from django.http import (HttpResponseBadRequest, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from core.sqlite_profile import run_serialized, serialized_write
 from .models import Post, Group, User, Follow
 from .forms import PostForm, CommentForm
-from .utils import get_paginator_helper, paginator
-from django.views.decorators.cache import cache_page
+from .utils import comments_page, get_paginator_helper, paginator
+from . import (api, exporter, search as post_search, thumbnails, timeline,
+               write_behind)
+from .conditional import (conditional_page, group_state, post_state,
+                          profile_state)
+from .counters import get_stats
+from .page_cache import (cache_page_versioned, group_scopes, index_scopes,
+                         profile_scopes)
 
 SYMBOLS_QUANTITY: int = 30
 
 
-@cache_page(20, key_prefix='index_page')
+@cache_page_versioned(index_scopes)
 def index(request):
     paginator_obj = get_paginator_helper(request)
     context = {
@@ -18,6 +27,8 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page(group_state)
+@cache_page_versioned(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     paginator_obj = get_paginator_helper(request, filter_name='group',
@@ -32,8 +43,12 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_page(profile_state)
+@cache_page_versioned(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    stats = get_stats(author)
     paginator_obj = get_paginator_helper(request, filter_name='author',
                                          filter_value=author)
     following = True
@@ -42,42 +57,134 @@ def profile(request, username):
             user=request.user,
             author=author,
         ).exists
+        pending = write_behind.pending_follow(request.user, author)
+        if pending is not None:
+            following = pending
 
     context = {
         'title': f'Профайл пользователя {author.get_full_name()}',
         'author': author,
         'page_obj': paginator_obj['page_obj'],
-        'post_total': paginator_obj['count_post'],
+        'post_total': stats.posts_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
         'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+def _export(request, posts, filename):
+    export_format = request.GET.get('format', 'jsonl')
+    if export_format not in exporter.FORMATS:
+        return HttpResponseBadRequest('Формат: jsonl или csv.')
+    render_rows, content_type = exporter.FORMATS[export_format]
+    response = StreamingHttpResponse(
+        render_rows(exporter.rows(posts)), content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="{filename}.{export_format}"')
+    return response
+
+
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    return _export(request, exporter.author_posts(author),
+                   f'posts-author-{author.pk}')
+
+
+def group_export(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return _export(request, exporter.group_posts(group),
+                   f'posts-group-{group.pk}')
+
+
+def _with_pending(page, post, user):
+    """Комментарии страницы и, на последней, ещё не записанные."""
+    if page.next_cursor:
+        return page.object_list
+    return page.object_list + write_behind.pending_comments(post, user)
+
+
+@conditional_page(post_state)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    author = post.author
-    comments = post.comments.all()
-    post_list = Post.objects.filter(author=author)
-    count_posts = post_list.count()
+    post = get_object_or_404(Post.objects.for_detail(), pk=post_id)
+    page = comments_page(post, after=request.GET.get('after'))
+    comments = _with_pending(page, post, request.user)
+    count_posts = get_stats(post.author).posts_count
     title = f"Пост {post.text[:SYMBOLS_QUANTITY]}"
     context = {
         "title": title,
         'form': CommentForm(),
         'comments': comments,
+        'comments_page': page,
         "post": post,
         "count_posts": count_posts,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@conditional_page(post_state)
+def post_comments(request, post_id):
+    """Следующая страница комментариев: фрагмент HTML или JSON."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    page = comments_page(post, after=request.GET.get('after'))
+    comments = _with_pending(page, post, request.user)
+    if request.GET.get('format') == 'json':
+        next_url = None
+        if page.next_cursor:
+            next_url = '{}?format=json&after={}'.format(
+                request.path, page.next_cursor)
+        return JsonResponse({
+            'results': [api.serialize_comment(comment)
+                        for comment in comments],
+            'next': next_url,
+        }, json_dumps_params={'ensure_ascii': False})
+    return render(request, 'posts/includes/comments.html', {
+        'post': post,
+        'comments': comments,
+        'comments_page': page,
+    })
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    group = author = None
+    if request.GET.get('group'):
+        group = get_object_or_404(Group, slug=request.GET['group'])
+    if request.GET.get('author'):
+        author = get_object_or_404(User, username=request.GET['author'])
+    posts, next_cursor = post_search.search(
+        query, group=group, author=author, after=request.GET.get('after'))
+    next_query = request.GET.copy()
+    next_query['after'] = next_cursor or ''
+    context = {
+        'title': f'Поиск: {query}' if query else 'Поиск',
+        'query': query,
+        'group': group,
+        'author': author,
+        'posts': posts,
+        'next_cursor': next_cursor,
+        'next_query': next_query.urlencode(),
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def _save_post(form, author=None):
+    post = form.save(commit=False)
+    if author is not None:
+        post.author = author
+    post.save()
+    if 'image' in form.changed_data:
+        thumbnails.schedule(post)
+    return post
+
+
 @login_required
 def new_post(request):
+    # Проверка формы (с обработкой картинки) идёт вне очереди записи.
     form = PostForm(request.POST or None, files=request.FILES or None)
     if not form.is_valid():
         return render(request, 'posts/create_post.html', {'form': form})
-    post = form.save(commit=False)
-    post.author = request.user
-    post.save()
+    run_serialized(lambda: _save_post(form, request.user))
     return redirect("posts:profile", request.user)
 
 
@@ -94,7 +201,7 @@ def post_edit(request, post_id):
         form = PostForm(request.POST or None, files=request.FILES or None,
                         instance=post)
         if form.is_valid():
-            form.save()
+            post = run_serialized(lambda: _save_post(form))
         return redirect('posts:post_detail', post.id)
 
     return render(request, 'posts/create_post.html', {
@@ -105,11 +212,15 @@ def post_edit(request, post_id):
 
 
 @login_required
+@serialized_write
 def add_comment(request, post_id):
     # Получите пост и сохраните его в переменную post.
     form = CommentForm(request.POST or None)
     post = get_object_or_404(Post, pk=post_id)
-    if form.is_valid():
+    if form.is_valid() and write_behind.enabled():
+        write_behind.add_comment(request.user, post,
+                                 form.cleaned_data['text'])
+    elif form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
@@ -119,8 +230,9 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator(request=request, post_list=post_list)
+    post_list = timeline.feed(request.user)
+    page_obj = paginator(request=request, post_list=post_list,
+                         ordering=timeline.FEED_ORDERING)
     context = {'page_obj': page_obj}
     return render(request, 'posts/follow.html', context)
 
@@ -130,18 +242,28 @@ def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author == request.user:
         return redirect('posts:profile', username=username)
-    if Follow.objects.filter(author=author, user=request.user).exists():
+    pending = write_behind.pending_follow(request.user, author)
+    if pending or pending is None and Follow.objects.filter(
+            author=author, user=request.user).exists():
+        return redirect('posts:profile', username=username)
+    if write_behind.enabled():
+        write_behind.follow(request.user, author)
         return redirect('posts:profile', username=username)
-    Follow.objects.create(
+    # Переход по ссылке — GET, поэтому очередь записи включаем здесь,
+    # вокруг самой записи вместе со счётчиками и лентой из сигналов.
+    run_serialized(lambda: Follow.objects.get_or_create(
         user=request.user,
         author=author
-    )
+    ))
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
+    if write_behind.enabled():
+        write_behind.unfollow(request.user, author)
+        return redirect('posts:profile', username=username)
     follow = Follow.objects.filter(author=author, user=request.user)
-    follow.delete()
+    run_serialized(follow.delete)
     return redirect('posts:profile', username=username)
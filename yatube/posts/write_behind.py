@@ -0,0 +1,357 @@
+"""Отложенная запись комментариев и подписок (write-behind).
+
+Включается путём к файлу очереди в WRITE_BEHIND_PATH
+(YATUBE_WRITE_BEHIND). Тогда add_comment, profile_follow
+и profile_unfollow не пишут в основную базу, а добавляют строку
+в локальную очередь SQLite и сразу отвечают. Фоновый поток процесса
+(или команда flush_write_behind) забирает очередь пачками и применяет
+её одной транзакцией: bulk_create для комментариев и подписок,
+один DELETE для отписок, счётчики и ленты — суммарно по пачке.
+
+Очередь в режиме WAL с synchronous=NORMAL переживает падение процесса.
+Номер последней применённой строки хранится в WriteBehindCheckpoint
+той же транзакцией, что и сами данные, поэтому повторный сброс после сбоя
+ничего не дублирует. Номера строк свои у каждого файла очереди, поэтому
+контрольная точка привязана к случайному идентификатору файла: файл,
+пересозданный по тому же пути, получает новую точку с нуля.
+
+Пока запись не применена, автор видит её сам: ожидающие комментарии
+дописываются к его странице поста, а кнопка подписки показывает
+ожидаемое состояние.
+
+Поток сброса запускается при старте веб-процесса (yatube/wsgi.py),
+чтобы строки, оставшиеся в очереди после перезапуска, применились
+сразу, а не с первой новой записью.
+"""
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import counters, page_cache, timeline
+from .models import Comment, Follow, Post, WriteBehindCheckpoint
+
+BUSY_TIMEOUT = 5.0
+BATCH_SIZE = 500
+PAIRS_PER_QUERY = 200
+FLUSH_INTERVAL = 0.5
+
+COMMENT = 'comment'
+FOLLOW = 'follow'
+UNFOLLOW = 'unfollow'
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS queue ('
+    ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+    ' kind TEXT NOT NULL,'
+    ' user_id INTEGER NOT NULL,'
+    ' target_id INTEGER NOT NULL,'
+    " text TEXT NOT NULL DEFAULT '',"
+    ' created REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS queue_target'
+    ' ON queue (target_id, user_id, kind)',
+    'CREATE TABLE IF NOT EXISTS queue_meta ('
+    ' id INTEGER PRIMARY KEY CHECK (id = 1),'
+    ' token TEXT NOT NULL)',
+)
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+class WriteBehindQueue:
+    """Очередь записей в отдельном файле SQLite."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(
+                self.path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            connection.execute(
+                'INSERT OR IGNORE INTO queue_meta (id, token) VALUES (1, ?)',
+                (uuid.uuid4().hex,))
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @property
+    def source(self):
+        """Имя контрольной точки: хост, путь и идентификатор файла."""
+        token = self._connection.execute(
+            'SELECT token FROM queue_meta WHERE id = 1').fetchone()[0]
+        return f'{socket.gethostname()}:{os.path.abspath(self.path)}:{token}'
+
+    def push(self, kind, user_id, target_id, text=''):
+        self._connection.execute(
+            'INSERT INTO queue (kind, user_id, target_id, text, created)'
+            ' VALUES (?, ?, ?, ?, ?)',
+            (kind, user_id, target_id, text, time.time()))
+
+    def take(self, after, limit):
+        return self._connection.execute(
+            'SELECT id, kind, user_id, target_id, text, created FROM queue'
+            ' WHERE id > ? ORDER BY id LIMIT ?', (after, limit)).fetchall()
+
+    def forget(self, up_to):
+        self._connection.execute('DELETE FROM queue WHERE id <= ?',
+                                 (up_to,))
+
+    def size(self):
+        return self._connection.execute(
+            'SELECT COUNT(*) FROM queue').fetchone()[0]
+
+    def is_empty(self):
+        return self._connection.execute(
+            'SELECT 1 FROM queue LIMIT 1').fetchone() is None
+
+    def comments(self, post_id, user_id):
+        return self._connection.execute(
+            'SELECT id, text, created FROM queue'
+            ' WHERE target_id = ? AND user_id = ? AND kind = ?'
+            ' ORDER BY id', (post_id, user_id, COMMENT)).fetchall()
+
+    def follow_state(self, user_id, author_id):
+        row = self._connection.execute(
+            'SELECT kind FROM queue'
+            ' WHERE target_id = ? AND user_id = ? AND kind IN (?, ?)'
+            ' ORDER BY id DESC LIMIT 1',
+            (author_id, user_id, FOLLOW, UNFOLLOW)).fetchone()
+        return None if row is None else row[0] == FOLLOW
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+_worker = None
+
+
+def get_queue():
+    """Очередь из настроек или None, если режим выключен."""
+    path = getattr(settings, 'WRITE_BEHIND_PATH', None)
+    if not path:
+        return None
+    with _queues_lock:
+        if path not in _queues:
+            _queues[path] = WriteBehindQueue(path)
+        return _queues[path]
+
+
+def enabled():
+    return get_queue() is not None
+
+
+def _push(kind, user_id, target_id, text='', scopes=()):
+    get_queue().push(kind, user_id, target_id, text)
+    # Страницы автора записи должны сразу показать ожидающее.
+    page_cache.bump(*scopes)
+    start_worker()
+
+
+def add_comment(user, post, text):
+    _push(COMMENT, user.pk, post.pk, text,
+          [page_cache.post_scope(post.pk)])
+
+
+def follow(user, author):
+    _push(FOLLOW, user.pk, author.pk,
+          scopes=[page_cache.author_scope(user.username),
+                  page_cache.author_scope(author.username)])
+
+
+def unfollow(user, author):
+    _push(UNFOLLOW, user.pk, author.pk,
+          scopes=[page_cache.author_scope(user.username),
+                  page_cache.author_scope(author.username)])
+
+
+def _created(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+def pending_comments(post, user):
+    """Ещё не записанные комментарии пользователя к посту."""
+    queue = get_queue()
+    if queue is None or not user.is_authenticated:
+        return []
+    return [
+        Comment(post=post, author=user, text=text,
+                created=_created(created))
+        for _, text, created in queue.comments(post.pk, user.pk)
+    ]
+
+
+def pending_follow(user, author):
+    """Ожидаемое состояние подписки или None, если очередь пуста."""
+    queue = get_queue()
+    if queue is None or not user.is_authenticated:
+        return None
+    return queue.follow_state(user.pk, author.pk)
+
+
+def _insert_as_is(model, objs):
+    """bulk_create без auto_now_add: даты берутся из объектов.
+
+    Как при загрузке фикстур (raw=True), pre_save полей не вызывается.
+    Флаги auto_now_add общих объектов полей не трогаем: их в это время
+    читают сохранения в других потоках процесса.
+    """
+    fields = [field for field in model._meta.concrete_fields
+              if not field.primary_key]
+    batch_size = max(connection.ops.bulk_batch_size(fields, objs), 1)
+    for start in range(0, len(objs), batch_size):
+        model._base_manager._insert(objs[start:start + batch_size],
+                                    fields=fields, raw=True)
+
+
+def _apply_comments(rows):
+    post_ids = set(Post.objects.filter(
+        pk__in={row[3] for row in rows}).values_list('pk', flat=True))
+    comments = [
+        Comment(post_id=post_id, author_id=user_id, text=text,
+                created=_created(created))
+        for _, _, user_id, post_id, text, created in rows
+        if post_id in post_ids
+    ]
+    # created берётся из очереди, а не из момента сброса.
+    _insert_as_is(Comment, comments)
+    per_post = Counter(comment.post_id for comment in comments)
+    for post_id, number in per_post.items():
+        counters.change_comments(post_id, number)
+    return [page_cache.post_scope(post_id) for post_id in per_post]
+
+
+def _matching(pairs):
+    """Подписки по парам (user_id, author_id), порциями по OR."""
+    pairs = list(pairs)
+    for start in range(0, len(pairs), PAIRS_PER_QUERY):
+        condition = Q()
+        for user_id, author_id in pairs[start:start + PAIRS_PER_QUERY]:
+            condition |= Q(user_id=user_id, author_id=author_id)
+        yield Follow.objects.filter(condition)
+
+
+def _apply_follows(rows):
+    # Из нескольких действий над одной парой важно только последнее.
+    wanted = {}
+    for _, kind, user_id, author_id, _, _ in rows:
+        if user_id != author_id:
+            wanted[(user_id, author_id)] = kind == FOLLOW
+    if not wanted:
+        return []
+    known = set(User.objects.filter(
+        pk__in={pk for pair in wanted for pk in pair},
+    ).values_list('pk', flat=True))
+    existing = set()
+    for follows in _matching(wanted):
+        existing.update(follows.values_list('user_id', 'author_id'))
+    added = [pair for pair, state in wanted.items()
+             if state and pair not in existing
+             and pair[0] in known and pair[1] in known]
+    removed = [pair for pair, state in wanted.items()
+               if not state and pair in existing]
+    Follow.objects.bulk_create(
+        [Follow(user_id=user_id, author_id=author_id)
+         for user_id, author_id in added], ignore_conflicts=True)
+    # bulk_create не шлёт сигналов: счётчики и ленты правим сами.
+    deltas = {}
+    for user_id, author_id in added:
+        deltas.setdefault(user_id, Counter())['following_count'] += 1
+        deltas.setdefault(author_id, Counter())['followers_count'] += 1
+        timeline.backfill(user_id, author_id)
+    for user_id, changes in deltas.items():
+        counters.change_user(user_id, **changes)
+    # А delete() шлёт post_delete, и follow_deleted всё сделает сам.
+    for follows in _matching(removed):
+        follows.delete()
+    usernames = User.objects.filter(pk__in=deltas).values_list(
+        'username', flat=True)
+    return [page_cache.author_scope(username) for username in usernames]
+
+
+def flush(queue=None, limit=BATCH_SIZE):
+    """Применяет одну пачку очереди; возвращает число строк."""
+    queue = queue or get_queue()
+    if queue is None or queue.is_empty():
+        return 0
+    with transaction.atomic():
+        # Первой в транзакции идёт запись в контрольную точку: она берёт
+        # блокировку, и другие сбрасывающие процессы ждут здесь, а не
+        # применяют ту же пачку дважды.
+        source = queue.source
+        checkpoints = WriteBehindCheckpoint.objects.filter(source=source)
+        if not checkpoints.update(updated_at=timezone.now()):
+            WriteBehindCheckpoint.objects.get_or_create(source=source)
+        checkpoint = checkpoints.get()
+        rows = queue.take(checkpoint.last_id, limit)
+        if rows:
+            scopes = _apply_comments(
+                [row for row in rows if row[1] == COMMENT])
+            scopes += _apply_follows(
+                [row for row in rows if row[1] != COMMENT])
+            checkpoint.last_id = rows[-1][0]
+            checkpoint.rows += len(rows)
+            checkpoint.save(update_fields=['last_id', 'rows', 'updated_at'])
+    # Удаляет и строки, применённые до сбоя, но не удалённые тогда:
+    # точка принадлежит этому файлу, так что всё до last_id применено.
+    queue.forget(checkpoint.last_id)
+    if rows:
+        page_cache.bump(*scopes)
+    return len(rows)
+
+
+def drain(queue=None):
+    """Сбрасывает очередь целиком; возвращает число строк."""
+    total = 0
+    while True:
+        applied = flush(queue)
+        total += applied
+        if not applied:
+            return total
+
+
+def _run_worker(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            drain()
+        except Exception:
+            logger.exception('Не удалось сбросить очередь записи')
+        finally:
+            close_old_connections()
+
+
+def start_worker():
+    """Запускает фоновый сброс очереди, если он ещё не запущен."""
+    global _worker
+    if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+        # Базу в памяти (тесты) другой поток не видит.
+        return
+    with _queues_lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        interval = getattr(settings, 'WRITE_BEHIND_FLUSH_INTERVAL',
+                           FLUSH_INTERVAL)
+        _worker = threading.Thread(target=_run_worker, args=(interval,),
+                                   name='write-behind', daemon=True)
+        _worker.start()
@@ -57,6 +57,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -97,11 +98,54 @@ DATABASES = {
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
+# Продакшен-профиль SQLite (см. core/sqlite_profile.py): WAL, PRAGMA,
+# постоянные соединения и очередь записи.
+SQLITE_PROFILE = bool(os.environ.get('YATUBE_SQLITE_PROFILE'))
+if SQLITE_PROFILE:
+    DATABASES['default'].update(
+        ENGINE='core.sqlite_backend',
+        CONN_MAX_AGE=int(os.environ.get('YATUBE_CONN_MAX_AGE', 600)),
+    )
+# Реплика только для чтения: путь к копии базы в YATUBE_REPLICA_DB.
+# Локально её обновляет команда sync_replica.
+if os.environ.get('YATUBE_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['YATUBE_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+    MIDDLEWARE.insert(1, 'core.middleware.ReplicaPinMiddleware')
+REPLICA_PIN_SECONDS = 5
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+# Общий для всех воркеров кэш: путь к файлу SQLite в YATUBE_SHARED_CACHE.
+if os.environ.get('YATUBE_SHARED_CACHE'):
+    CACHES['default'] = {
+        'BACKEND': 'core.sqlite_cache.SQLiteCache',
+        'LOCATION': os.environ['YATUBE_SHARED_CACHE'],
+        'OPTIONS': {
+            'MAX_BYTES': int(os.environ.get(
+                'YATUBE_SHARED_CACHE_BYTES', 256 * 1024 * 1024)),
+        },
+    }
+
+# Метрики всех воркеров суммируются в этом файле SQLite; без него
+# /metrics показывает только текущий процесс.
+METRICS_PATH = os.environ.get('YATUBE_METRICS_PATH')
+METRICS_FLUSH_INTERVAL = 1.0
+
+# Отложенная запись комментариев и подписок (posts/write_behind.py):
+# путь к файлу очереди SQLite; без него пишем сразу в базу.
+WRITE_BEHIND_PATH = os.environ.get('YATUBE_WRITE_BEHIND')
+WRITE_BEHIND_FLUSH_INTERVAL = 0.5
+
+# Хост, под которым прогрев (core/warmup.py) кладёт страницы в кэш.
+WARMUP_HOST = os.environ.get('YATUBE_WARMUP_HOST', 'localhost')
 
 
 # Password validation
@@ -145,5 +189,8 @@ USE_TZ = True
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Готовые миниатюры sorl запоминаются в LRU процесса (posts/thumbnail_cache.py).
+THUMBNAIL_BACKEND = 'posts.thumbnail_cache.CachedThumbnailBackend'
+
 STATIC_URL = '/static/'  # префикс для url
 STATIC_ROOT = os.path.join(BASE_DIR, 'static/')  # папка, в которой будет лежать статика
\ No newline at end of file
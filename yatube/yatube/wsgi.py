@@ -14,3 +14,17 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Прогрев до первых запросов (core/warmup.py): YATUBE_WARMUP=preload
+# в мастер-процессе до fork, любое другое значение — в каждом воркере.
+if os.environ.get('YATUBE_WARMUP'):
+    from core.warmup import warm_up
+
+    warm_up(preload=os.environ['YATUBE_WARMUP'] == 'preload')
+
+# Отложенная запись (posts/write_behind.py): поток сброса стартует сразу,
+# чтобы строки, оставшиеся в очереди после перезапуска, не ждали новой.
+if os.environ.get('YATUBE_WRITE_BEHIND'):
+    from posts.write_behind import start_worker
+
+    start_worker()